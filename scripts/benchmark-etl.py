@@ -0,0 +1,476 @@
+"""
+ETL基准测试: 在合成的StatCan数据上为UnemploymentDataETL的各阶段和转换脚本计时
+
+每个用例在独立的子进程中运行，准备工作（读取输入、生成待写出的数据等）不计入耗时，
+峰值内存取子进程的最大常驻内存（Linux上为VmHWM，其他平台为ru_maxrss），同时记录准备阶段结束时的峰值以便区分。
+结果写入JSON文件，可用--compare与之前提交的结果比较。
+
+用法示例:
+    python benchmark-etl.py --sizes 1e5 1e6
+    python benchmark-etl.py --sizes 1e6 --compare ../.etl_bench/etl-benchmark-<commit>.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，此时不记录峰值内存
+    resource = None
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('etl_benchmark')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RESULT_FORMAT = "etl-benchmark-v1"
+
+# 可选的基准阶段
+STAGES = ("load_csv", "csv_engines", "filters", "process_output", "save_to_json", "run_etl_pipeline", "converters")
+
+# ETL输入角色与合成表的对应关系
+SOURCE_TABLES = {"province": "14100287", "industry": "14100023", "occupation": "14100310"}
+
+# 能直接处理上述整表布局的转换脚本: (脚本, 输入表)
+CONVERTERS = [
+    ("csv-to-json.py", "14100023"),
+    ("statcan-data-downloader.py", "14100287"),
+]
+
+
+def load_script(filename: str):
+    """
+    按文件名加载scripts目录下的脚本模块（脚本名中含有连字符，无法直接import）
+
+    Args:
+        filename: 脚本文件名
+
+    Returns:
+        模块对象
+    """
+    module_name = os.path.splitext(filename)[0].replace("-", "_").replace(".", "_")
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb() -> Optional[float]:
+    """返回当前进程的峰值常驻内存（MB），不支持的平台返回None"""
+    # Linux上ru_maxrss会继承exec之前父进程的峰值，优先读取只属于当前地址空间的VmHWM
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _etl(data_dir: str, output_dir: str, cache_dir: Optional[str] = None, **options):
+    """创建读取合成数据的ETL处理器，options为UnemploymentDataETL的其他构造参数"""
+    etl_module = load_script("csv-to-json-etl.py")
+    return etl_module.UnemploymentDataETL(input_dir=data_dir, output_dir=output_dir, cache_dir=cache_dir, **options)
+
+
+def _registry(etl) -> List[Tuple]:
+    """返回以合成表为输入的输出注册表"""
+    return etl._output_registry(*(f"{SOURCE_TABLES[role]}.csv" for role in ("province", "industry", "occupation")))
+
+
+def _source_of(etl, name: str) -> Tuple[str, List[Tuple]]:
+    """返回输出的输入文件和完整注册表"""
+    registry = _registry(etl)
+    return next(source for other, source, _, _ in registry if other == name), registry
+
+
+def _prepare_load_csv(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """解析整张输入表（列投影为该表所有输出所需列的并集，不使用解析缓存）"""
+    etl = _etl(case["data_dir"], tmp_dir)
+    source = f"{case['target']}.csv"
+    usecols = etl._shared_usecols(_registry(etl), source)
+    return lambda: len(etl.load_csv(source, usecols=usecols)), case["size"]
+
+
+def _prepare_csv_engine(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """用指定的CSV解析器读取整张省份表的所有列（不使用解析缓存）"""
+    etl = _etl(case["data_dir"], tmp_dir, csv_engine=case["engine"])
+    if etl.csv_engine != case["engine"]:
+        raise RuntimeError(f"CSV解析器 {case['engine']} 不可用")
+    source = f"{SOURCE_TABLES['province']}.csv"
+    return lambda: len(etl.load_csv(source)), case["size"]
+
+
+def _prepare_filters(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """
+    在已解析的省份表上依次应用读取该表的每个输出的过滤条件
+
+    chained为逐个条件用布尔掩码取行（每个条件复制一次剩余数据），combined为filter_rows（合并为行位置后只取一次）。
+    """
+    etl_module = load_script("csv-to-json-etl.py")
+    etl = _etl(case["data_dir"], tmp_dir, cache_dir=case["cache_dir"])
+    source = f"{SOURCE_TABLES['province']}.csv"
+    registry = _registry(etl)
+    df = etl.clean_column_names(etl.load_csv(source, usecols=etl._shared_usecols(registry, source)))
+    filters = [etl._source_filters(etl.OUTPUT_SPECS[name]["filters"], etl.COLUMN_MAPPINGS[name])
+               for name, other, _, _ in registry if other == source and name in etl.COLUMN_MAPPINGS]
+
+    def chained(frame: pd.DataFrame, conditions: Dict) -> pd.DataFrame:
+        for col, values in conditions.items():
+            if col in frame.columns:
+                frame = frame[etl_module.column_mask(frame[col], values)]
+        return frame
+
+    apply = chained if case["mode"] == "chained" else etl.filter_rows
+    return lambda: sum(len(apply(df, conditions)) for conditions in filters), len(df) * len(filters)
+
+
+def _prepare_process_output(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """在已解析的输入表上处理单个输出（与共享扫描相同）"""
+    etl = _etl(case["data_dir"], tmp_dir, cache_dir=case["cache_dir"])
+    source, registry = _source_of(etl, case["target"])
+    df = etl.load_csv(source, usecols=etl._shared_usecols(registry, source))
+    etl._source_cache[source] = etl.clean_column_names(df)
+    return lambda: len(etl.process_output(case["target"], source)), len(df)
+
+
+def _prepare_save_to_json(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """把单个输出写出为JSON"""
+    etl = _etl(case["data_dir"], tmp_dir, cache_dir=case["cache_dir"])
+    source, registry = _source_of(etl, case["target"])
+    df = etl.load_csv(source, usecols=etl._shared_usecols(registry, source))
+    etl._source_cache[source] = etl.clean_column_names(df)
+    data = etl.process_output(case["target"], source)
+    etl._source_cache.clear()
+    del df
+    filename = etl.OUTPUT_SPECS[case["target"]]["filename"]
+
+    def run() -> int:
+        etl.save_to_json(data, filename)
+        return len(data)
+    return run, len(data)
+
+
+def _prepare_run_etl_pipeline(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """端到端运行ETL管道（不跳过未变化的输出，不使用解析缓存）"""
+    etl = _etl(case["data_dir"], tmp_dir)
+    files = [f"{SOURCE_TABLES[role]}.csv" for role in ("province", "industry", "occupation")]
+
+    def count_records() -> int:
+        total = 0
+        for path in produced.values():
+            with open(path, 'r', encoding='utf-8') as f:
+                total += len(json.load(f))
+        return total
+
+    produced = {}
+
+    def run() -> Callable[[], int]:
+        produced.update(etl.run_etl_pipeline(*files, skip_unchanged=False))
+        return count_records  # 输出记录数在计时结束后再统计
+    return run, case["size"] * len(files)
+
+
+def _prepare_converter(case: Dict, tmp_dir: str) -> Tuple[Callable[[], int], int]:
+    """运行转换脚本的处理函数"""
+    script, table = case["target"], case["table"]
+    module = load_script(script)
+    csv_path = os.path.join(case["data_dir"], f"{table}.csv")
+
+    if script == "csv-to-json.py":
+        def run() -> int:
+            result = module.process_csv_to_json(module.read_csv_files(case["data_dir"], [f"{table}.csv"]))
+            module.save_json(result, os.path.join(tmp_dir, "industry.json"))
+            return len(result)
+    elif script == "statcan-data-downloader.py":
+        downloader = module.StatCanDownloader(output_dir=tmp_dir)
+
+        def run() -> int:
+            # 与脚本main()中的示例相同的过滤和列选择
+            df = downloader.process_data(
+                csv_path,
+                filters={"GEO": ["Alberta", "Ontario", "British Columbia"],
+                         "Labour force characteristics": ["Unemployment rate"]},
+                selected_columns=["REF_DATE", "GEO", "Labour force characteristics", "VALUE"]
+            )
+            return len(df)
+    else:
+        raise ValueError(f"未知的转换脚本: {script}")
+    return run, case["size"]
+
+
+PREPARERS = {
+    "load_csv": _prepare_load_csv,
+    "csv_engines": _prepare_csv_engine,
+    "filters": _prepare_filters,
+    "process_output": _prepare_process_output,
+    "save_to_json": _prepare_save_to_json,
+    "run_etl_pipeline": _prepare_run_etl_pipeline,
+    "converters": _prepare_converter,
+}
+
+
+def run_case(case: Dict) -> Dict[str, Any]:
+    """
+    在当前（子）进程中运行单个用例
+
+    Args:
+        case: 用例描述
+
+    Returns:
+        结果字典，失败时包含error
+    """
+    result = {key: case[key] for key in ("stage", "target", "size")}
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory(prefix="etl_bench_") as tmp_dir, \
+                contextlib.redirect_stdout(io.StringIO()):
+            run, rows = PREPARERS[case["stage"]](case, tmp_dir)
+            setup_peak = peak_rss_mb()
+            started = time.perf_counter()
+            output_rows = run()
+            seconds = time.perf_counter() - started
+            if callable(output_rows):
+                output_rows = output_rows()
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    result.update({
+        "rows": rows,
+        "output_rows": output_rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "setup_peak_rss_mb": setup_peak
+    })
+    return result
+
+
+def build_cases(sizes: List[int], data_root: str, stages: List[str]) -> List[Dict]:
+    """
+    生成基准用例列表
+
+    Args:
+        sizes: 每张表的行数列表
+        data_root: 合成数据根目录，每种行数一个子目录
+        stages: 要运行的阶段
+
+    Returns:
+        用例列表
+    """
+    etl_module = load_script("csv-to-json-etl.py")
+    specs = etl_module.UnemploymentDataETL.OUTPUT_SPECS
+    cases = []
+    for size in sizes:
+        base = {"size": size, "data_dir": os.path.join(data_root, str(size)),
+                "cache_dir": os.path.join(data_root, str(size), ".cache")}
+        if "load_csv" in stages:
+            cases += [dict(base, stage="load_csv", target=table) for table in SOURCE_TABLES.values()]
+        if "csv_engines" in stages:
+            cases += [dict(base, stage="csv_engines", target=f"{SOURCE_TABLES['province']}:{engine}", engine=engine)
+                      for engine in ("c", "pyarrow")]
+        if "filters" in stages:
+            cases += [dict(base, stage="filters", target=f"{SOURCE_TABLES['province']}:{mode}", mode=mode)
+                      for mode in ("chained", "combined")]
+        for stage in ("process_output", "save_to_json"):
+            if stage in stages:
+                cases += [dict(base, stage=stage, target=name) for name in specs]
+        if "run_etl_pipeline" in stages:
+            cases.append(dict(base, stage="run_etl_pipeline", target="all"))
+        if "converters" in stages:
+            cases += [dict(base, stage="converters", target=script, table=table) for script, table in CONVERTERS]
+    return cases
+
+
+def ensure_data(sizes: List[int], data_root: str, seed: int) -> None:
+    """为每种行数生成合成数据（已存在的文件直接复用）"""
+    generator = load_script("generate-synthetic-statcan-data.py")
+    for size in sizes:
+        size_dir = os.path.join(data_root, str(size))
+        os.makedirs(size_dir, exist_ok=True)
+        marker = os.path.join(size_dir, ".generated.json")
+        expected = {"rows": size, "seed": seed, "tables": sorted(SOURCE_TABLES.values())}
+        if os.path.exists(marker):
+            with open(marker, 'r', encoding='utf-8') as f:
+                if json.load(f) == expected:
+                    continue
+        logger.info(f"生成 {size} 行的合成数据: {size_dir}")
+        for table in SOURCE_TABLES.values():
+            generator.generate_table(table, size, os.path.join(size_dir, f"{table}.csv"), seed=seed)
+        with open(marker, 'w', encoding='utf-8') as f:
+            json.dump(expected, f)
+
+
+def git_commit() -> Tuple[Optional[str], Optional[bool]]:
+    """返回当前提交和工作区是否有未提交的改动"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run_benchmarks(sizes: List[int], data_root: str, stages: List[str], seed: int = 0,
+                   repeat: int = 1) -> Dict[str, Any]:
+    """
+    运行全部基准用例，每个用例在新的子进程中运行，重复多次时取耗时最短的一次
+
+    Args:
+        sizes: 每张表的行数列表
+        data_root: 合成数据根目录
+        stages: 要运行的阶段
+        seed: 合成数据的随机数种子
+        repeat: 每个用例的重复次数
+
+    Returns:
+        结果文档
+    """
+    ensure_data(sizes, data_root, seed)
+    commit, dirty = git_commit()
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+
+    results = []
+    context = get_context("spawn")
+    for case in build_cases(sizes, data_root, stages):
+        best = None
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, case).result()
+            if "error" in result:
+                best = result
+                break
+            if best is None or result["seconds"] < best["seconds"]:
+                best = result
+        if "error" in best:
+            logger.warning(f"{best['stage']}:{best['target']} ({best['size']}行) 失败: {best['error']}")
+        else:
+            logger.info(f"{best['stage']}:{best['target']} ({best['size']}行) 耗时 {best['seconds']:.3f} 秒，"
+                        f"{best['rows_per_sec']:.0f} 行/秒，峰值内存 {best['peak_rss_mb']}MB")
+        results.append(best)
+
+    return {
+        "format": RESULT_FORMAT,
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "repeat": repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "pyarrow": pyarrow_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[str]:
+    """
+    比较两次基准结果，打印每个用例的耗时和峰值内存变化
+
+    Args:
+        previous: 之前的结果文档
+        current: 本次的结果文档
+        threshold: 判定为性能退化的相对变化阈值
+
+    Returns:
+        退化的用例描述列表
+    """
+    def key(result):
+        return result["stage"], result["target"], result["size"]
+
+    baseline = {key(result): result for result in previous.get("results", []) if "error" not in result}
+    regressions = []
+    print(f"与提交 {previous.get('commit')} 比较:")
+    for result in current["results"]:
+        old = baseline.get(key(result))
+        if old is None or "error" in result:
+            continue
+        label = f"{result['stage']}:{result['target']} ({result['size']}行)"
+        time_change = result["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        line = f"  {label:<48} {old['seconds']:>9.3f}s -> {result['seconds']:>9.3f}s ({time_change:+.1%})"
+        rss_change = 0.0
+        if old.get("peak_rss_mb") and result.get("peak_rss_mb"):
+            rss_change = result["peak_rss_mb"] / old["peak_rss_mb"] - 1
+            line += f"  内存 {old['peak_rss_mb']:.0f}MB -> {result['peak_rss_mb']:.0f}MB ({rss_change:+.1%})"
+        print(line)
+        if time_change > threshold or rss_change > threshold:
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="在合成的StatCan数据上对ETL各阶段和转换脚本进行基准测试")
+    parser.add_argument("--sizes", nargs="+", type=lambda text: int(float(text)), default=[100000],
+                        help="每张表的行数，可指定多个，如 1e5 1e6 5e7")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="要运行的阶段")
+    parser.add_argument("--data_dir", default="../.etl_bench/data", help="合成数据目录（相对于脚本目录）")
+    parser.add_argument("--output_file", help="结果JSON文件，默认为 ../.etl_bench/etl-benchmark-<提交>.json")
+    parser.add_argument("--compare", help="与之前的结果JSON文件比较，出现退化时以状态码1退出")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定为退化的相对变化阈值")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例的重复次数，取最短耗时")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机数种子")
+    args = parser.parse_args()
+
+    data_root = os.path.join(SCRIPT_DIR, args.data_dir)
+    document = run_benchmarks(args.sizes, data_root, args.stages, seed=args.seed, repeat=args.repeat)
+
+    output_file = args.output_file or os.path.join(
+        SCRIPT_DIR, "../.etl_bench", f"etl-benchmark-{(document['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    logger.info(f"基准结果已保存到 {output_file}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, document, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 个用例退化超过 {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+数据文件压缩报告: 比较public/data中每个JSON文件的原始、gzip和brotli大小以及解压、解析耗时
+
+先为每个文件并行生成最高压缩级别的.gz和.br兄弟文件（已是最新的跳过，.br需要brotli），再逐个文件测量:
+大小、解压耗时、JSON解析耗时，以及在给定带宽下"传输 + 解压 + 解析"的估计总耗时，并选出每种带宽下最快的组合。
+--columnar会对记录数组文件额外评估ETL的列式布局（columnar-v1），用于比较不同格式与压缩的组合。
+解压和解析耗时在Python中测量，只作为浏览器中相对快慢的参考。
+
+用法示例:
+    python compression-report.py
+    python compression-report.py --columnar --bandwidth_kbps 400 1600 10000
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from statcan_common import brotli, compress_bytes, precompress_files, write_json_columnar
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('compression_report')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REPORT_FORMAT = "compression-report-v1"
+
+# 各压缩编码的解压函数
+DECOMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {"gzip": gzip.decompress}
+if brotli is not None:
+    DECOMPRESSORS["br"] = brotli.decompress
+
+
+def median_ms(func: Callable[[], Any], repeat: int) -> float:
+    """
+    多次运行函数，返回耗时的中位数（毫秒）
+
+    Args:
+        func: 无参数函数
+        repeat: 运行次数
+
+    Returns:
+        耗时中位数（毫秒）
+    """
+    timings = []
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure_variants(layout: str, raw: bytes, compressed: Dict[str, bytes], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """
+    测量一种布局的原始和各压缩版本的大小、解压耗时和解析耗时
+
+    Args:
+        layout: 布局名称（records或columnar）
+        raw: 原始JSON字节
+        compressed: {编码: 压缩后的字节}
+        repeat: 计时重复次数
+
+    Returns:
+        {组合名称: {"bytes", "decode_ms", "parse_ms"}}
+    """
+    text = raw.decode('utf-8')
+    parse_ms = median_ms(lambda: json.loads(text), repeat)
+    variants = {layout: {"bytes": len(raw), "decode_ms": 0.0, "parse_ms": parse_ms}}
+    for encoding, payload in compressed.items():
+        variants[f"{layout}+{encoding}"] = {
+            "bytes": len(payload),
+            "decode_ms": median_ms(lambda: DECOMPRESSORS[encoding](payload), repeat),
+            "parse_ms": parse_ms
+        }
+    return variants
+
+
+def columnar_bytes(raw: bytes) -> Optional[bytes]:
+    """
+    把记录数组JSON转换为列式布局，非记录数组（或已是列式布局）时返回None
+
+    Args:
+        raw: 原始JSON字节
+
+    Returns:
+        列式布局的JSON字节
+    """
+    payload = json.loads(raw)
+    if not isinstance(payload, list) or not payload or not all(isinstance(item, dict) for item in payload):
+        return None
+    df = pd.DataFrame(payload)
+    value_columns = [col for col in ("Value",) if col in df.columns]
+    buffer = io.StringIO()
+    write_json_columnar(df, buffer, value_columns=value_columns)
+    return buffer.getvalue().encode('utf-8')
+
+
+def analyze_file(path: str, data_dir: str, repeat: int, bandwidths: List[float],
+                 columnar: bool) -> Dict[str, Any]:
+    """
+    测量单个文件的各种格式与压缩组合
+
+    Args:
+        path: JSON文件路径
+        data_dir: 数据目录，用于生成相对路径
+        repeat: 计时重复次数
+        bandwidths: 估计传输耗时所用的带宽（kbps）
+        columnar: 是否额外评估列式布局
+
+    Returns:
+        文件报告
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    compressed = {}
+    for encoding in DECOMPRESSORS:
+        sibling = path + (".gz" if encoding == "gzip" else ".br")
+        if os.path.exists(sibling):
+            with open(sibling, 'rb') as f:
+                compressed[encoding] = f.read()
+    variants = measure_variants("records", raw, compressed, repeat)
+
+    if columnar:
+        converted = columnar_bytes(raw)
+        if converted is not None:
+            variants.update(measure_variants("columnar", converted,
+                                             {encoding: compress_bytes(converted, encoding)
+                                              for encoding in DECOMPRESSORS}, repeat))
+
+    # 估计总耗时 = 传输 + 解压 + 解析
+    best = {}
+    for kbps in bandwidths:
+        for variant in variants.values():
+            variant.setdefault("total_ms", {})[str(kbps)] = (variant["bytes"] * 8 / kbps
+                                                             + variant["decode_ms"] + variant["parse_ms"])
+        best[str(kbps)] = min(variants, key=lambda name: variants[name]["total_ms"][str(kbps)])
+    return {"file": os.path.relpath(path, data_dir), "variants": variants, "best": best}
+
+
+def summarize(files: List[Dict[str, Any]], bandwidths: List[float]) -> Dict[str, Dict[str, Any]]:
+    """
+    按组合汇总所有文件的大小和估计总耗时
+
+    不能转换为列式布局的文件在列式组合中按同一压缩编码的records组合计入，即"能用列式布局的文件都用列式布局"。
+
+    Args:
+        files: 文件报告列表
+        bandwidths: 带宽列表（kbps）
+
+    Returns:
+        {组合名称: {"bytes", "total_ms": {带宽: 毫秒}}}
+    """
+    def variant(report: Dict[str, Any], name: str) -> Dict[str, Any]:
+        variants = report["variants"]
+        return variants[name] if name in variants else variants["+".join(["records"] + name.split("+")[1:])]
+
+    names = sorted({name for report in files for name in report["variants"]})
+    totals = {}
+    for name in names:
+        totals[name] = {
+            "bytes": sum(variant(report, name)["bytes"] for report in files),
+            "total_ms": {str(kbps): sum(variant(report, name)["total_ms"][str(kbps)] for report in files)
+                         for kbps in bandwidths}
+        }
+    return totals
+
+
+def run_report(data_dir: str, workers: Optional[int] = None, repeat: int = 5,
+               bandwidths: Optional[List[float]] = None, columnar: bool = False,
+               compress: bool = True) -> Dict[str, Any]:
+    """
+    生成数据目录的压缩报告
+
+    Args:
+        data_dir: 数据目录
+        workers: 压缩的工作进程数，为None时使用CPU核数
+        repeat: 计时重复次数
+        bandwidths: 估计传输耗时所用的带宽（kbps）
+        columnar: 是否额外评估列式布局
+        compress: 是否先生成或更新.gz和.br兄弟文件
+
+    Returns:
+        报告字典
+    """
+    bandwidths = bandwidths or [400, 1600, 10000]
+    paths = sorted(os.path.join(root, name) for root, _, names in os.walk(data_dir)
+                   for name in names if name.endswith(".json"))
+    if compress:
+        started = time.perf_counter()
+        precompress_files(paths, workers=workers)
+        logger.info(f"已为 {len(paths)} 个文件生成压缩文件，耗时 {time.perf_counter() - started:.1f} 秒")
+    if brotli is None:
+        logger.warning("未安装brotli，报告中不包含brotli结果")
+
+    files = []
+    for path in paths:
+        report = analyze_file(path, data_dir, repeat, bandwidths, columnar)
+        variants = report["variants"]
+        raw_bytes = variants["records"]["bytes"]
+        sizes = ", ".join(f"{name} {variant['bytes'] / 1024:.0f} KB ({variant['bytes'] / max(raw_bytes, 1):.0%}, "
+                          f"解压 {variant['decode_ms']:.1f} ms)"
+                          for name, variant in variants.items() if name != "records")
+        logger.info(f"{report['file']}: 原始 {raw_bytes / 1024:.0f} KB, {sizes}")
+        files.append(report)
+
+    totals = summarize(files, bandwidths)
+    for kbps in bandwidths:
+        if totals:
+            fastest = min(totals, key=lambda name: totals[name]["total_ms"][str(kbps)])
+            logger.info(f"{kbps:g} kbps 下总耗时最短的组合: {fastest} "
+                        f"({totals[fastest]['total_ms'][str(kbps)] / 1000:.1f} 秒)")
+
+    return {
+        "format": REPORT_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "data_dir": data_dir,
+        "bandwidth_kbps": bandwidths,
+        "repeat": repeat,
+        "totals": totals,
+        "files": files
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为数据文件生成gzip/brotli压缩文件并比较大小和解压耗时")
+    parser.add_argument("--data_dir", default=os.path.join(SCRIPT_DIR, "..", "public", "data"),
+                        help="数据目录（递归处理其中的JSON文件）")
+    parser.add_argument("--output_file",
+                        default=os.path.join(SCRIPT_DIR, "..", ".etl_bench", "compression-report.json"),
+                        help="报告文件路径")
+    parser.add_argument("--workers", type=int, default=None, help="压缩的工作进程数，默认为CPU核数")
+    parser.add_argument("--repeat", type=int, default=5, help="解压和解析计时的重复次数")
+    parser.add_argument("--bandwidth_kbps", type=float, nargs="+", default=[400, 1600, 10000],
+                        help="估计传输耗时所用的带宽（kbps），默认对应慢速3G、快速3G和普通宽带")
+    parser.add_argument("--columnar", action="store_true", help="额外评估记录数组文件的列式布局")
+    parser.add_argument("--no_compress", action="store_true", help="不生成压缩文件，只测量已有的压缩文件")
+    args = parser.parse_args()
+
+    data_dir = os.path.normpath(args.data_dir)
+    report = run_report(data_dir, workers=args.workers, repeat=args.repeat, bandwidths=args.bandwidth_kbps,
+                        columnar=args.columnar, compress=not args.no_compress)
+
+    output_file = os.path.normpath(args.output_file)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"压缩报告已写入: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
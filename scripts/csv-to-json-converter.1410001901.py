@@ -5,6 +5,8 @@ import json
 import glob
 from datetime import datetime
 
+from statcan_common import normalize_ref_dates
+
 def convert_csv_to_json(input_dir, output_dir):
     """
     将Statistics Canada的CSV文件转换为指定格式的JSON文件
@@ -34,6 +36,25 @@ def convert_csv_to_json(input_dir, output_dir):
     
     print(f"合并后共有{len(combined_df)}条记录")
     
+    # 处理无法解析的日期: 取原字符串的年月部分
+    def format_date(date_str):
+        try:
+            if isinstance(date_str, str) and len(date_str) >= 7:
+                year_month = date_str[:7]
+                return f"{year_month}-01T00:00:00"
+            else:
+                return str(date_str) + "-01T00:00:00"
+        except:
+            return str(date_str) + "-01T00:00:00"
+    
+    # 标准化日期为ISO格式 (YYYY-MM-01T00:00:00)，每个不同的REF_DATE只解析一次
+    if len(combined_df) > 0:
+        combined_df['Date'] = normalize_ref_dates(combined_df['REF_DATE'], output_format='%Y-%m-01T00:00:00')
+        unparsed = combined_df['Date'].isna()
+        if unparsed.any():
+            print(f"警告: {unparsed.sum()}条记录的REF_DATE无法解析，按原字符串格式化")
+            combined_df.loc[unparsed, 'Date'] = combined_df.loc[unparsed, 'REF_DATE'].map(format_date)
+    
     # GeoID和GeoName的映射
     geo_mapping = {
         'Canada': {'id': '01', 'name': 'Canada'},
@@ -52,18 +73,6 @@ def convert_csv_to_json(input_dir, output_dir):
         'Nunavut': {'id': '60', 'name': 'Territories'}
     }
     
-    # 处理日期格式的函数
-    def format_date(date_str):
-        try:
-            # 处理不同格式的日期，标准化为ISO格式 (YYYY-MM-01T00:00:00)
-            if isinstance(date_str, str) and len(date_str) >= 7:
-                year_month = date_str[:7]
-                return f"{year_month}-01T00:00:00"
-            else:
-                return str(date_str) + "-01T00:00:00"
-        except:
-            return str(date_str) + "-01T00:00:00"
-    
     # 处理地区名称的函数
     def map_geo(geo_str):
         # 处理缩写和全名的映射
@@ -123,7 +132,7 @@ def convert_csv_to_json(input_dir, output_dir):
             
             # 创建数据记录
             record = {
-                "Date": format_date(row['REF_DATE']),
+                "Date": row['Date'],
                 "GeoID": geo_info['id'],
                 "GeoName": geo_info['name'],
                 "Characteristic": row['Labour force characteristics'] if isinstance(row['Labour force characteristics'], str) else 'Unknown',
@@ -162,7 +171,7 @@ def convert_csv_to_json(input_dir, output_dir):
             
             # 创建数据记录
             record = {
-                "Date": format_date(row['REF_DATE']),
+                "Date": row['Date'],
                 "GeoID": geo_info['id'],
                 "GeoName": geo_info['name'],
                 "Characteristics": row['Labour force characteristics'] if isinstance(row['Labour force characteristics'], str) else 'Unknown',
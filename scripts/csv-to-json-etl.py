@@ -1,10 +1,31 @@
 import pandas as pd
+import contextlib
+import csv
+import hashlib
 import json
 import os
 import logging
+import tempfile
+import time
+import tracemalloc
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional, Union, Any
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union, Any
+
+import statcan_common
+from statcan_common import (
+    ISO_DATE_FORMAT, PRECOMPRESSED_ENCODINGS, broadcast_by_codes, column_mask, extract_classification_code,
+    factorize_values, filter_positions, normalize_ref_dates, precompress_files, write_json_columnar, write_json_records
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow为可选依赖，缺失时使用pandas的C解析器，并行模式由各工作进程自行解析CSV
+    pa = pa_csv = feather = None
 
 # 设置日志
 logging.basicConfig(
@@ -13,55 +34,947 @@ logging.basicConfig(
 )
 logger = logging.getLogger('csv_to_json_etl')
 
+
+def _current_rss_bytes() -> Optional[int]:
+    """
+    读取当前进程的常驻内存（RSS），仅支持提供/proc的系统
+    
+    Returns:
+        RSS字节数，无法读取时返回None
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageProfiler:
+    """
+    ETL各阶段的计时与内存记录器
+    
+    每个阶段记录墙钟时间、CPU时间、输入/输出行数和RSS变化；trace_memory为True时还通过tracemalloc记录
+    Python堆的分配变化和峰值（开销较大，默认关闭）。阶段可以嵌套，嵌套阶段的峰值会计入外层阶段。
+    """
+    
+    REPORT_FORMAT = "etl-run-report-v1"
+    
+    def __init__(self, trace_memory: bool = False):
+        """
+        初始化记录器
+        
+        Args:
+            trace_memory: 是否使用tracemalloc记录Python堆内存
+        """
+        self.trace_memory = trace_memory
+        self.events: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+        self._origin = time.time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def reset(self) -> None:
+        """清空已记录的阶段，开始新一次运行"""
+        self.events = []
+        self._stack = []
+        self._origin = time.time()
+    
+    @contextlib.contextmanager
+    def stage(self, name: str, output: Optional[str] = None, rows_in: Optional[int] = None):
+        """
+        记录一个阶段，调用方可在返回的记录中填写rows_out
+        
+        Args:
+            name: 阶段名称
+            output: 所属输出，为None时沿用外层阶段的输出
+            rows_in: 输入行数
+            
+        Yields:
+            阶段记录字典
+        """
+        parent = self._stack[-1] if self._stack else None
+        record = {
+            "stage": name,
+            "output": output if output is not None else (parent["record"]["output"] if parent else None),
+            "rows_in": rows_in,
+            "rows_out": None,
+            "depth": len(self._stack),
+            "pid": os.getpid()
+        }
+        frame = {"record": record, "child_peak": 0}
+        if self.trace_memory:
+            # 重置峰值以测量本阶段的峰值，重置前的峰值属于外层阶段
+            frame["py_start"], frame["peak_before"] = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        rss_start = _current_rss_bytes()
+        self._stack.append(frame)
+        record["start"] = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            rss_end = _current_rss_bytes()
+            record["rss_delta_mb"] = (rss_end - rss_start) / 2 ** 20 if rss_start and rss_end else None
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["child_peak"])
+                record["py_alloc_delta_mb"] = (current - frame["py_start"]) / 2 ** 20
+                record["py_peak_delta_mb"] = (peak - frame["py_start"]) / 2 ** 20
+                if parent:
+                    parent["child_peak"] = max(parent["child_peak"], peak, frame["peak_before"])
+            self._stack.pop()
+            self.events.append(record)
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        生成运行报告: 按开始时间排列的全部阶段记录，以及按阶段名称汇总的耗时
+        
+        Returns:
+            报告字典
+        """
+        stages = []
+        summary: Dict[str, Dict[str, float]] = {}
+        for event in sorted(self.events, key=lambda item: item["start"]):
+            stages.append(dict(event, start=event["start"] - self._origin))
+            total = summary.setdefault(event["stage"], {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            total["count"] += 1
+            total["wall_seconds"] += event["wall_seconds"]
+            total["cpu_seconds"] += event["cpu_seconds"]
+        return {
+            "format": self.REPORT_FORMAT,
+            "started": datetime.fromtimestamp(self._origin).isoformat(timespec="seconds"),
+            "trace_memory": self.trace_memory,
+            "summary": summary,
+            "stages": stages
+        }
+    
+    def write_report(self, path: str) -> None:
+        """
+        写出JSON运行报告
+        
+        Args:
+            path: 报告文件路径
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+    
+    def write_trace(self, path: str) -> None:
+        """
+        写出Chrome Trace Event格式的跟踪文件，可在chrome://tracing、Perfetto或speedscope中以火焰图查看
+        
+        Args:
+            path: 跟踪文件路径
+        """
+        trace_events = []
+        for event in sorted(self.events, key=lambda item: (item["start"], item["depth"])):
+            args = {key: value for key, value in event.items()
+                    if key not in ("stage", "start", "wall_seconds", "pid", "depth") and value is not None}
+            trace_events.append({
+                "name": event["stage"],
+                "cat": event["output"] or "etl",
+                "ph": "X",
+                "ts": round(event["start"] * 1e6),
+                "dur": round(event["wall_seconds"] * 1e6),
+                "pid": event["pid"],
+                "tid": event["pid"],
+                "args": args
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+class DataValidationError(ValueError):
+    """输出数据未通过写出前的校验，该输出不会被写出"""
+    
+    def __init__(self, output: str, failures: List[str]):
+        """
+        Args:
+            output: 输出名称
+            failures: 未通过的检查说明
+        """
+        self.output = output
+        self.failures = failures
+        super().__init__(f"输出 {output} 未通过数据校验: " + "; ".join(failures))
+    
+    def __reduce__(self):
+        # 默认的pickle只保存消息参数，并行模式下从工作进程传回时需要按构造参数重建
+        return DataValidationError, (self.output, self.failures)
+
+
 class UnemploymentDataETL:
     """失业率数据ETL处理类"""
     
-    def __init__(self, input_dir: str = "../canada_unemployment_data", output_dir: str = "../public/data"):
+    # 各处理器的列映射，格式为 {原列名: 新列名}；映射中的原列名即该处理器需要从CSV读取的全部列
+    COLUMN_MAPPINGS: Dict[str, Dict[str, str]] = {
+        "province": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristic",
+            "Gender": "Sex",
+            "Age group": "Age",
+            "Statistics": "StatType",
+            "VALUE": "Value"
+        },
+        "city": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristics",
+            "VALUE": "Value"
+        },
+        "industry": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "North American Industry Classification System (NAICS)": "NAICS Description",
+            "Labour force characteristics": "Characteristic",
+            "VALUE": "Value",
+            "Gender": "Sex",
+            "Age group": "Age"
+        },
+        "occupation": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "National Occupational Classification (NOC)": "NOC Description",
+            "Labour force characteristics": "Characteristics",
+            "VALUE": "Value",
+            "Sex": "Sex"
+        },
+        "education": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristics",
+            "Educational attainment": "Education",
+            "VALUE": "Value",
+            "Sex": "Sex",
+            "Age group": "Age"
+        },
+        "age": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristic",
+            "VALUE": "Value",
+            "Sex": "Sex",
+            "Age group": "Age"
+        },
+        "sex": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristic",
+            "VALUE": "Value",
+            "Sex": "Series"
+        },
+        "region": {
+            "REF_DATE": "Date",
+            "GEO": "GeoName",
+            "Labour force characteristics": "Characteristics",
+            "VALUE": "Value"
+        }
+    }
+    
+    # 输出规格: 每个输出的输入表、过滤条件（以输出列名表示）、常量列、GeoID映射、派生列和输出列顺序，
+    # 列映射见COLUMN_MAPPINGS。新增输出只需在这里和COLUMN_MAPPINGS中各加一项，读取同一输入表的输出共用一次扫描。
+    #   source: 输入表，对应run_etl_pipeline的province_file/industry_file/occupation_file
+    #   derived_from: 派生输出的父输出。派生输出没有source和列映射，在父输出处理后的DataFrame上按filters（父输出的
+    #   列名）选出行，再添加常量列并选择列，不重新读取输入表；须声明在父输出之后，父输出本身不能是派生输出
+    #   geo_ids: 按GeoName映射GeoID，未映射的值取geo_id_default（缺省为NaN）
+    #   constants: 常量列；copies: {新列: 源列}；classification_codes: {代码列: 分类描述列}
+    OUTPUT_SPECS: Dict[str, Dict[str, Any]] = {
+        "province": {
+            "source": "province",
+            "filename": "province.json",
+            "label": "省份数据",
+            "filters": {"Characteristic": ["Unemployment rate"]},
+            "geo_ids": {
+                "Canada": "01",
+                "Alberta": "48",
+                "British Columbia": "59",
+                "Manitoba": "46",
+                "New Brunswick": "13",
+                "Newfoundland and Labrador": "10",
+                "Nova Scotia": "12",
+                "Ontario": "35",
+                "Prince Edward Island": "11",
+                "Quebec": "24",
+                "Saskatchewan": "47"
+            },
+            "columns": ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
+        },
+        "alberta": {
+            "derived_from": "province",
+            "filename": "alberta.json",
+            "label": "艾伯塔省数据",
+            "filters": {"GeoName": ["Alberta"]},
+            "constants": {"GeoID": 48},
+            "columns": ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
+        },
+        "city": {
+            "source": "province",
+            "filename": "city.json",
+            "label": "城市数据",
+            "filters": {
+                "GeoName": ["Calgary", "Edmonton", "Vancouver", "Toronto", "Montreal", "Ottawa"],
+                "Characteristics": ["Unemployment rate"]
+            },
+            "geo_ids": {
+                "Calgary": "825",
+                "Edmonton": "835",
+                "Vancouver": "933",
+                "Toronto": "535",
+                "Montreal": "462",
+                "Ottawa": "505"
+            },
+            "columns": ["Date", "GeoID", "GeoName", "Characteristics", "Value"]
+        },
+        "education": {
+            "source": "province",
+            "filename": "education.json",
+            "label": "教育程度数据",
+            "filters": {"Characteristics": ["Unemployment rate"]},
+            "constants": {"GeoID": "01"},  # 加拿大的GeoID
+            "columns": ["Date", "GeoID", "GeoName", "Characteristics", "Education", "Sex", "Age", "Value"]
+        },
+        "age": {
+            "source": "province",
+            "filename": "age.json",
+            "label": "年龄组数据",
+            "filters": {"Characteristic": ["Unemployment rate"], "GeoName": ["Canada"]},
+            "constants": {"GeoID": "01"},  # 加拿大的GeoID
+            "columns": ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
+        },
+        "sex": {
+            "source": "province",
+            "filename": "sex.json",
+            "label": "性别数据",
+            "filters": {"Characteristic": ["Unemployment rate"], "GeoName": ["Canada"]},
+            "copies": {"labels": "Date"},  # labels列与Date相同
+            "columns": ["Date", "Value", "Series", "labels"]
+        },
+        "region": {
+            "source": "province",
+            "filename": "region.json",
+            "label": "区域数据",
+            "filters": {
+                "Characteristics": ["Unemployment rate"],
+                "GeoName": ["Calgary", "Edmonton", "Lethbridge-Medicine Hat", "Camrose-Drumheller", "Red Deer",
+                            "Northeast"]
+            },
+            "geo_ids": {
+                "Calgary": 4830,
+                "Edmonton": 4835,
+                "Lethbridge-Medicine Hat": 4810,
+                "Camrose-Drumheller": 4840,
+                "Red Deer": 4820,
+                "Northeast": 5980
+            },
+            "columns": ["Date", "GeoID", "GeoName", "Characteristics", "Value"]
+        },
+        "industry": {
+            "source": "industry",
+            "filename": "industry.json",
+            "label": "行业数据",
+            "filters": {"Characteristic": ["Unemployment rate"]},
+            "constants": {"GeoID": "2021A000011124", "NAICS": ""},  # 加拿大的GeoID，空NAICS代码
+            "columns": ["Date", "GeoID", "GeoName", "NAICS Description", "Characteristic", "Sex", "Age", "Value",
+                        "NAICS"]
+        },
+        "occupation": {
+            "source": "occupation",
+            "filename": "occupation.json",
+            "label": "职业数据",
+            "filters": {"Characteristics": ["Unemployment rate", "Estimate"], "GeoName": ["Alberta", "Canada"]},
+            # 例如: "Total employed, all occupations [00-95]" -> "00-95"，没有方括号时提取开头的数字部分
+            "classification_codes": {"NOC": "NOC Description"},
+            "geo_ids": {"Alberta": "48"},
+            "geo_id_default": "01",
+            "columns": ["Date", "GeoID", "GeoName", "Characteristics", "NOC", "NOC Description", "Sex", "Value"]
+        }
+    }
+    
+    # 图表数据: 按客户端src/utils/dataProcessing.js中同名处理函数（processProvinceData等）的规则，预先筛选、按月透视并
+    # 按日期排序的宽表，写入输出目录的CHART_DIR子目录。每行为 {"date", "formattedDate", <系列名>: 值, ...}，
+    # 与这些函数返回值的形状一致，只是date为ISO日期字符串，由客户端的hydrateChartSeries还原为Date。
+    #   filters: 以输出列名表示的过滤条件；series: 其值作为宽表列名的维度列
+    CHART_DIR = "chart"
+    CHART_SPECS: Dict[str, Dict[str, Any]] = {
+        "province": {
+            "filters": {"Characteristic": ["Unemployment rate"], "Age": ["15 years and over"],
+                        "Sex": ["Both sexes"]},
+            "series": "GeoName"
+        },
+        "industry": {
+            "filters": {"Characteristic": ["Unemployment rate"]},
+            "series": "NAICS Description"
+        },
+        "education": {
+            "filters": {"Characteristics": ["Unemployment rate"]},
+            "series": "Education"
+        }
+    }
+    
+    # 输出摘要: 每个输出一份小的元数据文件，写入输出目录的SUMMARY_DIR子目录（与输出同名），供客户端在加载（或不加载）
+    # 完整数据前构建选择器和坐标轴。包含行数、日期覆盖范围、每个维度列（Date、Value和复制列以外的列）的不同值，
+    # 以及每个系列（维度列取值的一种组合）的统计: 有值的记录数、最小值、最大值、最新的非空值及其日期、起止日期
+    SUMMARY_DIR = "summary"
+    SUMMARY_FORMAT = "output-summary-v1"
+    
+    # 按时间范围分片: 每个输出从最新月份往前划分为与客户端filterByTimeframe选项对应的分片，每个分片只包含比
+    # 上一个分片更早的数据（1y为最近12个月，3y为之前的24个月，依此类推，all为其余全部数据），写入
+    # SHARD_DIR/<输出名称>/<分片>.json；SHARD_DIR下的清单记录各分片的日期范围、行数和字节数，供客户端按需加载
+    SHARD_DIR = "shards"
+    SHARD_MANIFEST = "manifest.json"
+    TIMEFRAME_SHARDS: List[Tuple[str, Optional[int]]] = [("1y", 12), ("3y", 36), ("5y", 60), ("10y", 120),
+                                                         ("all", None)]
+    
+    # 写出前的数据校验规则: 每个输出使用DEFAULT_VALIDATION，VALIDATION_RULES中的项按键覆盖默认值；
+    # 输出规格中过滤条件涉及的列自动只允许过滤值。只检查输出中存在的列，缺少required中的列则校验失败。
+    #   required: 必需的列；dtypes: {列: "string"或"numeric"}；max_null_rate: {列: 允许的最大缺失比例}
+    #   value_range: Value列的取值范围(最小值, 最大值)，None表示不限；allowed_values: 额外的允许值 {列: 值列表}
+    #   unique_keys: 唯一标识一行的列。多数输出没有保留StatCan的Statistics、Data type等维度，同一键对应多行是
+    #   预期的（客户端取最后一个值），因此只对保留了全部维度的输出声明
+    DEFAULT_VALIDATION: Dict[str, Any] = {
+        "required": ["Date", "Value"],
+        "dtypes": {"Date": "string", "GeoName": "string", "Value": "numeric"},
+        "max_null_rate": {"Date": 0.0, "GeoName": 0.0, "Value": 0.2},
+        "value_range": (0, 100),
+        "allowed_values": {},
+        "unique_keys": None
+    }
+    VALIDATION_RULES: Dict[str, Dict[str, Any]] = {
+        "occupation": {"value_range": (0, None)},  # 包含人数估计值
+        "industry": {"unique_keys": ["Date", "GeoName", "NAICS Description", "Characteristic", "Sex", "Age"]}
+    }
+    
+    # 读取CSV时的列类型提示，只对实际读取的列生效；低基数的维度列以分类类型读取并在整个处理过程中保持
+    SOURCE_DTYPES: Dict[str, str] = {
+        'REF_DATE': 'category',
+        'GEO': 'category',
+        'Labour force characteristics': 'category',
+        'Gender': 'category',
+        'Sex': 'category',
+        'Age group': 'category',
+        'Statistics': 'category',
+        'Educational attainment': 'category',
+        'North American Industry Classification System (NAICS)': 'category',
+        'National Occupational Classification (NOC)': 'category',
+        'VALUE': 'float64',
+        'SCALAR_FACTOR': 'str',
+        'STATUS': 'str',
+        'SYMBOL': 'str',
+        'TERMINATED': 'str',
+        'DECIMALS': 'int64'
+    }
+    
+    # StatCan为每个值声明的小数位数所在的列，round_values启用时随输出所需列一起读取，用于舍入Value
+    DECIMALS_COLUMN = "DECIMALS"
+    
+    # pandas默认视为缺失值的字符串，pyarrow解析器使用同一组值，保证两种解析器得到相同的缺失值
+    CSV_NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                     "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+    
+    # 可选的CSV解析器: "c"为pandas的单线程C解析器，"pyarrow"为pyarrow的多线程解析器，"auto"在安装了pyarrow时使用pyarrow
+    CSV_ENGINES = ("auto", "c", "pyarrow")
+    
+    # 构建清单文件名，记录每个输出的输入文件哈希、处理配置和代码版本，用于增量构建
+    MANIFEST_FILENAME = ".etl-manifest.json"
+    
+    # 流式读取时用于估算每行内存占用的采样行数
+    CHUNK_SAMPLE_ROWS = 1000
+    
+    def __init__(self, input_dir: str = "../canada_unemployment_data", output_dir: str = "../public/data",
+                 memory_budget_mb: Optional[float] = None, compact_json: bool = False,
+                 output_format: str = "records", cache_dir: Optional[str] = "../.etl_cache",
+                 cache_max_mb: float = 4096, profile_dir: Optional[str] = None,
+                 profile_trace: bool = False, profile_memory: bool = False, timeframe_shards: bool = True,
+                 precompress: bool = False, validate: bool = True, csv_engine: str = "auto",
+                 round_values: bool = True):
         """
         初始化ETL处理器
         
         Args:
             input_dir: 输入目录，包含CSV文件
             output_dir: 输出目录，用于保存JSON文件
+            memory_budget_mb: 流式读取的内存预算（MB），为None时整表一次性读入内存
+            compact_json: 是否输出不含空白的紧凑JSON
+            output_format: 输出布局，"records"为记录数组，"columnar"为字典编码的列式布局
+            cache_dir: 已解析表的Feather缓存目录，为None时不使用缓存（需要pyarrow）
+            cache_max_mb: 缓存目录的容量上限（MB），超出时按最近使用时间淘汰
+            profile_dir: 运行报告目录，设置后记录每个阶段的耗时、行数和内存变化，为None时不记录
+            profile_trace: 是否同时写出火焰图可用的跟踪文件（Chrome Trace Event格式）
+            profile_memory: 是否使用tracemalloc记录Python堆内存（开销较大）
+            timeframe_shards: 是否在完整输出之外按时间范围分片写出（见TIMEFRAME_SHARDS）
+            precompress: 是否为生成的每个数据文件并行生成最高压缩级别的.gz和.br兄弟文件（.br需要brotli）
+            validate: 是否在写出前按VALIDATION_RULES校验每个输出，未通过时抛出DataValidationError且不写出该输出
+            csv_engine: 整表读取CSV时的解析器，见CSV_ENGINES；未安装pyarrow时自动使用"c"（流式读取始终使用"c"）
+            round_values: 是否把Value舍入到输入表DECIMALS列声明的小数位数，去掉浮点误差带来的多余位数
         """
         # 使用相对路径
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.input_dir = os.path.normpath(os.path.join(script_dir, input_dir))
         self.output_dir = os.path.normpath(os.path.join(script_dir, output_dir))
+        self.memory_budget_mb = memory_budget_mb
+        self.compact_json = compact_json
+        if output_format not in ("records", "columnar"):
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        self.output_format = output_format
+        self.cache_dir = os.path.normpath(os.path.join(script_dir, cache_dir)) if cache_dir and feather else None
+        self.cache_max_mb = cache_max_mb
+        # 文件哈希缓存: {(路径, 大小, 修改时间): 哈希}，避免同一次运行中重复哈希大文件
+        self._digest_memo: Dict[Tuple[str, int, int], str] = {}
+        # 最近一次run_etl_pipeline中每个输出的处理耗时（秒）
+        self.last_run_timings: Dict[str, float] = {}
         os.makedirs(self.output_dir, exist_ok=True)
+        # 共享扫描缓存: {文件路径: 已解析的DataFrame}，仅在run_etl_pipeline运行期间有效
+        self._source_cache: Dict[str, pd.DataFrame] = {}
+        # 共享扫描中已计算的过滤掩码: {文件路径: {(原始列名, 值): (掩码, 命中行数)}}，与_source_cache同时释放
+        self._pass_masks: Dict[str, Dict[Tuple, Tuple[np.ndarray, int]]] = {}
+        # 增量模式下每个输入文件需要读取的最早日期: {文件路径: ISO日期字符串}，仅在run_etl_pipeline运行期间有效
+        self._date_floors: Dict[str, str] = {}
+        # 有派生输出的父输出在本次运行中的处理结果: {输出名称: DataFrame}，最后一个派生输出处理完后释放
+        self._parent_results: Dict[str, pd.DataFrame] = {}
+        # 最近一次run_etl_pipeline中每个输出的最新日期，写入构建清单供下一次增量更新使用
+        self._latest_dates: Dict[str, Optional[str]] = {}
+        self.timeframe_shards = timeframe_shards
+        self.precompress = precompress
+        self.validate = validate
+        if csv_engine not in self.CSV_ENGINES:
+            raise ValueError(f"不支持的CSV解析器: {csv_engine}")
+        if csv_engine == "pyarrow" and pa_csv is None:
+            logger.warning("未安装pyarrow，改用pandas的C解析器")
+        self.csv_engine = "pyarrow" if csv_engine != "c" and pa_csv is not None else "c"
+        self.round_values = round_values
+        # 最近一次run_etl_pipeline中每个重新生成的输出文件的大小变化，格式为 {输出名称: {"before", "after"}}
+        self.last_run_sizes: Dict[str, Dict[str, Optional[int]]] = {}
+        # 最近一次run_etl_pipeline中每个输出写出的分片，写入分片清单
+        self._shards: Dict[str, List[Dict[str, Any]]] = {}
+        # 阶段记录器，未设置profile_dir时为None，各阶段不产生额外开销
+        self.profile_dir = os.path.normpath(os.path.join(script_dir, profile_dir)) if profile_dir else None
+        self.profile_trace = profile_trace
+        self.profile_memory = profile_memory
+        self.profiler = StageProfiler(trace_memory=profile_memory) if profile_dir else None
         logger.info(f"初始化ETL处理器，输入目录: {self.input_dir}, 输出目录: {self.output_dir}")
     
-    def load_csv(self, file_path: str) -> Optional[pd.DataFrame]:
+    def load_csv(self, file_path: str, row_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+                 usecols: Optional[List[str]] = None, min_date: Optional[str] = None) -> Optional[pd.DataFrame]:
         """
         加载CSV文件
         
         Args:
             file_path: CSV文件路径
+            row_filter: 以原始列名表示的过滤条件，格式同filter_rows，也可以是多组条件的列表（满足任一组即保留），
+                仅在流式读取时逐块应用
+            usecols: 需要读取的原始列名，为None时读取全部列；文件中不存在的列会被忽略
+            min_date: 只保留REF_DATE不早于该ISO日期的行（增量模式），为None时读取全部行
             
         Returns:
             DataFrame对象，如果加载失败则返回None
         """
+        with self._stage("load_csv") as stage:
+            df = self._load_csv(file_path, row_filter, usecols, min_date)
+            stage["rows_out"] = 0 if df is None else len(df)
+        return df
+    
+    def _load_csv(self, file_path: str, row_filter: Optional[Dict[str, Union[str, List[str]]]],
+                  usecols: Optional[List[str]], min_date: Optional[str]) -> Optional[pd.DataFrame]:
+        """load_csv的实现，参数和返回值同load_csv"""
         try:
             full_path = os.path.join(self.input_dir, file_path) if not os.path.isabs(file_path) else file_path
             if not os.path.exists(full_path):
                 logger.error(f"文件不存在: {full_path}")
                 return None
-                
-            # 使用低内存模式和适当的类型推断加载大文件
-            df = pd.read_csv(full_path, encoding='utf-8', low_memory=False, dtype={
-                'VALUE': 'float64',
-                'SCALAR_FACTOR': 'str',
-                'STATUS': 'str',
-                'SYMBOL': 'str',
-                'TERMINATED': 'str',
-                'DECIMALS': 'int64'
-            })
+            
+            # 列投影: 未使用的列在解析时直接跳过，不会被物化
+            read_columns = None
+            if usecols is not None:
+                wanted = set(usecols)
+                read_columns = lambda col: col.strip() in wanted
+            
+            # 优先以内存映射方式读取已解析表的缓存
+            cache_path = self._parsed_cache_path(full_path, row_filter, usecols)
+            if cache_path and os.path.exists(cache_path):
+                df = feather.read_table(cache_path, memory_map=True).to_pandas()
+                os.utime(cache_path)  # 更新最近使用时间，供淘汰策略使用
+                if min_date:
+                    df = self._filter_min_date(df, min_date)
+                logger.info(f"从缓存加载 {file_path} 成功，形状: {df.shape}")
+                return df
+            
+            # 增量模式: 跳过文件开头所有早于min_date的行，不解析它们
+            skiprows = self._leading_rows_before(full_path, min_date) if min_date else None
+            if self.memory_budget_mb:
+                df = self._read_csv_chunked(full_path, self.SOURCE_DTYPES, row_filter, read_columns,
+                                            skiprows=skiprows, min_date=min_date)
+            else:
+                df = self._read_csv(full_path, self.SOURCE_DTYPES, read_columns, skiprows)
+                if min_date:
+                    df = self._filter_min_date(df, min_date)
             logger.info(f"加载CSV文件 {file_path} 成功，形状: {df.shape}")
+            
+            # 增量读取的结果只是部分数据，不写入缓存
+            if cache_path and not min_date:
+                self._write_parsed_cache(df, cache_path)
             return df
         except Exception as e:
             logger.error(f"加载CSV文件 {file_path} 失败: {e}")
             return None
     
+    def _stage(self, name: str, output: Optional[str] = None, rows_in: Optional[int] = None):
+        """
+        返回记录一个阶段的上下文管理器；未启用记录时返回空操作
+        
+        Args:
+            name: 阶段名称
+            output: 所属输出，为None时沿用外层阶段的输出
+            rows_in: 输入行数
+            
+        Returns:
+            上下文管理器，进入时得到阶段记录字典
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext({})
+        return self.profiler.stage(name, output=output, rows_in=rows_in)
+    
+    def _run_stage(self, name: str, func, df: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
+        """
+        以阶段记录运行一个DataFrame变换，记录输入和输出行数；未启用记录时直接调用
+        
+        Args:
+            name: 阶段名称
+            func: 变换函数，第一个参数为DataFrame
+            df: 输入DataFrame
+            
+        Returns:
+            变换后的DataFrame
+        """
+        if self.profiler is None:
+            return func(df, *args, **kwargs)
+        with self.profiler.stage(name, rows_in=len(df)) as stage:
+            result = func(df, *args, **kwargs)
+            stage["rows_out"] = len(result)
+        return result
+    
+    def _write_profile(self) -> None:
+        """写出本次运行的阶段报告和可选的跟踪文件，并输出耗时最多的阶段"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        report_path = os.path.join(self.profile_dir, "etl-run-report.json")
+        self.profiler.write_report(report_path)
+        logger.info(f"运行报告已写入: {report_path}")
+        if self.profile_trace:
+            trace_path = os.path.join(self.profile_dir, "etl-trace.json")
+            self.profiler.write_trace(trace_path)
+            logger.info(f"跟踪文件已写入: {trace_path}")
+        summary = self.profiler.report()["summary"]
+        for name, total in sorted(summary.items(), key=lambda item: -item[1]["wall_seconds"])[:5]:
+            logger.info(f"阶段 {name}: {total['count']} 次，墙钟 {total['wall_seconds']:.2f} 秒，"
+                        f"CPU {total['cpu_seconds']:.2f} 秒")
+    
+    def _parsed_cache_path(self, full_path: str, row_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+                           usecols: Optional[List[str]] = None) -> Optional[str]:
+        """
+        计算已解析表在缓存中的路径，键由源文件哈希、列类型、列投影和（流式读取时的）过滤条件决定
+        
+        Args:
+            full_path: CSV文件完整路径
+            row_filter: 以原始列名表示的过滤条件
+            usecols: 需要读取的原始列名
+            
+        Returns:
+            缓存文件路径，未启用缓存时返回None
+        """
+        if not self.cache_dir:
+            return None
+        key = {
+            "source_hash": self._file_digest(full_path),
+            "dtype": self.SOURCE_DTYPES,
+            "usecols": sorted(usecols) if usecols is not None else None,
+            # 只有流式读取时过滤条件才会影响读取结果
+            "row_filter": row_filter if self.memory_budget_mb else None
+        }
+        key_hash = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        stem = os.path.splitext(os.path.basename(full_path))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{key_hash[:16]}.feather")
+    
+    def _write_parsed_cache(self, df: pd.DataFrame, cache_path: str) -> None:
+        """
+        将已解析表写入缓存（未压缩Feather，便于内存映射），并按容量上限淘汰最久未使用的缓存
+        
+        Args:
+            df: 已解析的DataFrame
+            cache_path: 缓存文件路径
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"写入解析缓存 {cache_path} 失败: {e}")
+            return
+        
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".feather"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        limit = self.cache_max_mb * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path == cache_path:
+                continue
+            os.remove(path)
+            total -= size
+            logger.info(f"解析缓存超出容量上限，已淘汰 {path}")
+    
+    def _read_csv(self, full_path: str, dtype: Dict[str, str], usecols: Optional[Any] = None,
+                  skiprows: Optional[range] = None) -> pd.DataFrame:
+        """
+        整表读取CSV文件，按csv_engine选择解析器；pyarrow解析失败时回退到pandas的C解析器
+        
+        Args:
+            full_path: CSV文件完整路径
+            dtype: 列类型
+            usecols: 列投影，为接收列名的函数或None
+            skiprows: 表头之后需要跳过的连续行（文件行号从1开始）
+            
+        Returns:
+            DataFrame
+        """
+        if self.csv_engine == "pyarrow":
+            try:
+                return self._read_csv_pyarrow(full_path, dtype, usecols, skiprows)
+            except (pa.ArrowException, ValueError) as e:
+                logger.warning(f"pyarrow解析 {full_path} 失败，改用pandas的C解析器: {e}")
+        # 使用低内存模式和适当的类型推断加载大文件
+        return pd.read_csv(full_path, encoding='utf-8', low_memory=False, dtype=dtype, usecols=usecols,
+                           skiprows=skiprows)
+    
+    def _read_csv_pyarrow(self, full_path: str, dtype: Dict[str, str], usecols: Optional[Any] = None,
+                          skiprows: Optional[range] = None) -> pd.DataFrame:
+        """
+        用pyarrow的多线程解析器读取CSV文件，结果与pd.read_csv相同: 类型映射相同，分类列的类别按值排序，
+        缺失值字符串与pandas默认值一致
+        
+        Args:
+            full_path: CSV文件完整路径
+            dtype: 列类型（category、float64、int64、str）
+            usecols: 列投影，为接收列名的函数或None
+            skiprows: 表头之后需要跳过的连续行（文件行号从1开始）
+            
+        Returns:
+            DataFrame
+        """
+        with open(full_path, 'r', encoding='utf-8-sig', newline='') as f:
+            header = next(csv.reader(f), [])
+        columns = [col for col in header if usecols is None or usecols(col)]
+        arrow_types = {"category": pa.dictionary(pa.int32(), pa.string()), "float64": pa.float64(),
+                       "int64": pa.int64(), "str": pa.string()}
+        column_types = {col: arrow_types[dtype[col]] for col in columns if dtype.get(col) in arrow_types}
+        if skiprows is not None and list(skiprows[:1]) not in ([], [1]):
+            raise ValueError("pyarrow解析器只支持跳过表头之后的连续行")
+        
+        table = pa_csv.read_csv(
+            full_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, skip_rows_after_names=len(skiprows or ())),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, include_columns=columns,
+                                                  null_values=self.CSV_NA_VALUES, strings_can_be_null=True)
+        )
+        df = table.to_pandas()
+        # pandas按值排序类别，pyarrow按首次出现的顺序，统一后列式输出的字典顺序与C解析器一致
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+        return df
+    
+    def _read_csv_chunked(self, full_path: str, dtype: Dict[str, str],
+                          row_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+                          usecols: Optional[Any] = None, skiprows: Optional[range] = None,
+                          min_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        在内存预算内分块读取CSV文件，每个分块先过滤再累积
+        
+        Args:
+            full_path: CSV文件完整路径
+            dtype: 列类型
+            row_filter: 以原始列名表示的过滤条件
+            usecols: 传给pd.read_csv的列投影
+            skiprows: 传给pd.read_csv的跳过行
+            min_date: 只保留REF_DATE不早于该ISO日期的行
+            
+        Returns:
+            与整表读取后再过滤结果相同的DataFrame（保留原始行索引）
+        """
+        # 根据采样行的实际内存占用估算分块大小，解析过程中的临时对象按一倍额外开销计算
+        sample = pd.read_csv(full_path, encoding='utf-8', nrows=self.CHUNK_SAMPLE_ROWS, dtype=dtype,
+                             usecols=usecols)
+        bytes_per_row = max(sample.memory_usage(deep=True).sum() / max(len(sample), 1), 1)
+        chunksize = max(int(self.memory_budget_mb * 1024 * 1024 / (bytes_per_row * 2)), self.CHUNK_SAMPLE_ROWS)
+        logger.info(f"流式读取 {full_path}，内存预算 {self.memory_budget_mb}MB，分块大小 {chunksize} 行")
+        
+        parts = []
+        with pd.read_csv(full_path, encoding='utf-8', low_memory=False, dtype=dtype, usecols=usecols,
+                         skiprows=skiprows, chunksize=chunksize) as reader:
+            for chunk in reader:
+                if row_filter:
+                    chunk = self.clean_column_names(chunk)
+                    chunk = chunk[self._row_mask(chunk, row_filter)]
+                if min_date:
+                    chunk = self._filter_min_date(chunk, min_date)
+                parts.append(chunk)
+        
+        if not parts:
+            return sample.iloc[0:0]
+        if len(parts) == 1:
+            return parts[0]
+        
+        # 各分块推断出的类别不同，统一为排序后的类别并集（与整表读取的结果一致）后再合并，避免退化为object列
+        for col in parts[0].columns:
+            if isinstance(parts[0][col].dtype, pd.CategoricalDtype):
+                categories = sorted(set().union(*(part[col].cat.categories for part in parts)))
+                for part in parts:
+                    part[col] = part[col].cat.set_categories(categories)
+        return pd.concat(parts)
+    
+    def _filter_min_date(self, df: pd.DataFrame, min_date: str) -> pd.DataFrame:
+        """
+        只保留REF_DATE不早于min_date的行，每个不同的日期只解析一次
+        
+        Args:
+            df: 原始数据
+            min_date: ISO日期字符串
+            
+        Returns:
+            过滤后的DataFrame
+        """
+        df = self.clean_column_names(df)
+        if "REF_DATE" not in df.columns:
+            return df
+        dates = normalize_ref_dates(df["REF_DATE"]).fillna("")
+        return df[(dates >= min_date).to_numpy()]
+    
+    def _leading_rows_before(self, full_path: str, min_date: str) -> Optional[range]:
+        """
+        只读取REF_DATE一列，找出文件开头连续早于min_date的行
+        
+        StatCan的整表CSV按REF_DATE升序排列，这些行通常就是全部历史数据，跳过它们后只需完整解析新增的部分。
+        
+        Args:
+            full_path: CSV文件完整路径
+            min_date: ISO日期字符串
+            
+        Returns:
+            传给pd.read_csv的skiprows（文件行号，不含表头），没有可跳过的行时返回None
+        """
+        dates = self._read_csv(full_path, {"REF_DATE": "category"}, usecols=lambda col: col.strip() == "REF_DATE")
+        if dates.shape[1] == 0:
+            return None
+        keep = (normalize_ref_dates(dates.iloc[:, 0]).fillna("") >= min_date).to_numpy()
+        first = int(keep.argmax()) if keep.any() else len(keep)
+        return range(1, first + 1) if first > 0 else None
+    
+    def _row_mask(self, df: pd.DataFrame,
+                  filters: Union[Dict[str, Union[str, List[str]]], List[Dict[str, Union[str, List[str]]]]]) -> pd.Series:
+        """
+        计算满足全部过滤条件的行掩码，语义与filter_rows相同
+        
+        Args:
+            df: 输入DataFrame
+            filters: 过滤条件，格式为 {列名: 值或值列表}；为列表时表示多组条件，满足其中任一组即保留
+            
+        Returns:
+            布尔Series
+        """
+        if isinstance(filters, list):
+            mask = np.zeros(len(df), dtype=bool)
+            for group in filters:
+                mask |= self._row_mask(df, group).to_numpy()
+            return pd.Series(mask, index=df.index)
+        mask = np.ones(len(df), dtype=bool)
+        for col, values in filters.items():
+            if col in df.columns:
+                mask &= column_mask(df[col], values)
+        return pd.Series(mask, index=df.index)
+    
+    def map_categorical(self, series: pd.Series, mapping: Dict[str, Any], default: Any = np.nan) -> pd.Series:
+        """
+        按编码查表映射列值，每个不同值只映射一次
+        
+        Args:
+            series: 输入列
+            mapping: 映射字典，格式为 {原值: 新值}
+            default: 未出现在映射中的值（包括缺失值）对应的结果
+            
+        Returns:
+            映射后的Series
+        """
+        codes, categories = factorize_values(series)
+        lookup = [mapping.get(category, default) for category in categories]
+        return broadcast_by_codes(codes, lookup, series.index, missing=default).infer_objects()
+    
+    def _source_filters(self, filters: Dict[str, Union[str, List[str]]],
+                        column_mapping: Dict[str, str]) -> Dict[str, Union[str, List[str]]]:
+        """
+        将以输出列名表示的过滤条件转换为原始CSV列名，以便在读取时下推
+        
+        Args:
+            filters: 过滤条件，格式为 {输出列名: 值或值列表}
+            column_mapping: 列映射字典，格式为 {原列名: 新列名}
+            
+        Returns:
+            以原始列名表示的过滤条件
+        """
+        reverse_mapping = {new: old for old, new in column_mapping.items()}
+        return {reverse_mapping.get(col, col): values for col, values in filters.items()}
+    
+    def _plan_rows(self, df: pd.DataFrame, filters: Dict[str, Union[str, List[str]]],
+                   masks: Dict[Tuple, Tuple[np.ndarray, int]]) -> np.ndarray:
+        """
+        按选择性从高到低依次应用过滤条件，返回保留行的位置
+        
+        每个(列, 值)条件在同一次扫描中只计算一次掩码，读取同一输入表的各输出共用；
+        命中行数最少的条件先展开为行位置，其余条件只在剩余行上取值。
+        
+        Args:
+            df: 输入DataFrame（原始列名）
+            filters: 以原始列名表示的过滤条件
+            masks: 掩码缓存，格式为 {(列名, 值): (掩码, 命中行数)}
+            
+        Returns:
+            升序排列的行位置数组
+        """
+        rows = filter_positions(df, filters, masks, log=self._log_filter)
+        return np.arange(len(df)) if rows is None else rows
+    
+    @staticmethod
+    def _log_filter(col: str, values: List[str], remaining: int) -> None:
+        """记录一个过滤条件应用后的剩余行数"""
+        logger.info(f"应用过滤条件 {col}: {values}, 剩余行数: {remaining}")
+    
+    def _pass_filter(self, outputs: List[Tuple], source: str) -> Optional[List[Dict[str, Union[str, List[str]]]]]:
+        """
+        合并读取同一输入表的各输出的过滤条件: 只要满足任一输出的条件就保留该行，用于共享扫描时的读取下推
+        
+        Args:
+            outputs: 输出注册表
+            source: 输入文件
+            
+        Returns:
+            以原始列名表示的多组过滤条件，有输出需要全部行时返回None
+        """
+        groups = []
+        for name, other_source, _, _ in outputs:
+            if other_source != source:
+                continue
+            scanned = self._scanned_output(name)
+            group = self._source_filters(self.OUTPUT_SPECS[scanned]["filters"], self.COLUMN_MAPPINGS[scanned])
+            if not group:
+                return None
+            if group not in groups:
+                groups.append(group)
+        return groups or None
+    
     def clean_column_names(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         清理列名，移除空格和特殊字符
@@ -88,10 +1001,8 @@ class UnemploymentDataETL:
         """
         if date_col in df.columns:
             try:
-                # 尝试将日期列转换为datetime格式
-                df[date_col] = pd.to_datetime(df[date_col])
-                # 将日期格式化为ISO格式字符串
-                df[date_col] = df[date_col].dt.strftime('%Y-%m-%dT%H:%M:%S')
+                # 每个不同的日期按固定格式只解析一次，再按编码广播为ISO格式字符串
+                df[date_col] = normalize_ref_dates(df[date_col])
                 logger.info(f"日期列 {date_col} 格式化成功")
             except Exception as e:
                 logger.warning(f"日期列 {date_col} 格式化失败: {e}")
@@ -117,23 +1028,17 @@ class UnemploymentDataETL:
     
     def filter_rows(self, df: pd.DataFrame, filters: Dict[str, Union[str, List[str]]]) -> pd.DataFrame:
         """
-        过滤行
+        过滤行: 所有条件合并为一组行位置后只取一次行，不为每个条件复制剩余数据
         
         Args:
             df: 输入DataFrame
             filters: 过滤条件，格式为 {列名: 值或值列表}
             
         Returns:
-            过滤后的DataFrame
+            过滤后的DataFrame，没有可应用的条件时返回原DataFrame
         """
-        for col, values in filters.items():
-            if col in df.columns:
-                if isinstance(values, list):
-                    df = df[df[col].isin(values)]
-                else:
-                    df = df[df[col] == values]
-                logger.info(f"应用过滤条件 {col}: {values}, 剩余行数: {len(df)}")
-        return df
+        rows = filter_positions(df, filters, log=self._log_filter)
+        return df if rows is None else df.take(rows)
     
     def select_columns(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
         """
@@ -153,28 +1058,52 @@ class UnemploymentDataETL:
             logger.info(f"选择列成功: {valid_columns}")
         return df
     
-    def transform_value(self, df: pd.DataFrame, value_col: str = "VALUE") -> pd.DataFrame:
+    def transform_value(self, df: pd.DataFrame, value_col: str = "VALUE",
+                        decimals_col: Optional[str] = None) -> pd.DataFrame:
         """
-        转换值列，确保数值类型正确，并将NaN替换为null
+        转换值列为可空浮点类型（Float64），缺失值由有效性掩码表示，写出时直接写为null
+        
+        不把数值逐个装箱为Python对象，值列保持与float64相同的内存占用。给出小数位数列时，
+        每个值舍入到该行声明的位数（每种位数一次向量化舍入），写出的JSON即为该精度下最短的数字文本。
         
         Args:
             df: 输入DataFrame
             value_col: 值列名
+            decimals_col: 小数位数列名，为None或不存在时不舍入
             
         Returns:
             处理后的DataFrame
         """
         if value_col in df.columns:
             try:
-                # 将值列转换为float类型
-                df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
-                # 将NaN替换为None（在转为JSON时会变成null）
-                df[value_col] = df[value_col].replace({np.nan: None})
-                logger.info(f"值列 {value_col} 转换成功，NaN已替换为None")
+                # 无法解析的值和NaN都转换为缺失值（在转为JSON时会变成null）
+                values = pd.to_numeric(df[value_col], errors='coerce').astype("Float64")
+                if decimals_col is not None and decimals_col in df.columns:
+                    values = self.round_to_decimals(values, df[decimals_col])
+                df[value_col] = values
+                logger.info(f"值列 {value_col} 转换成功，缺失值将写为null")
             except Exception as e:
                 logger.warning(f"值列 {value_col} 转换失败: {e}")
         return df
     
+    def round_to_decimals(self, values: pd.Series, decimals: pd.Series) -> pd.Series:
+        """
+        把每个值舍入到对应行声明的小数位数，小数位数缺失的值保持不变
+        
+        Args:
+            values: Float64值列
+            decimals: 小数位数列
+            
+        Returns:
+            舍入后的Float64值列
+        """
+        data = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        places = pd.to_numeric(decimals, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        for place in np.unique(places[~np.isnan(places)]):
+            rows = places == place
+            data[rows] = np.round(data[rows], int(place))
+        return pd.Series(pd.array(data, dtype="Float64"), index=values.index, name=values.name)
+    
     def add_missing_columns(self, df: pd.DataFrame, required_columns: Dict[str, Any]) -> pd.DataFrame:
         """
         添加缺失的列
@@ -192,125 +1121,140 @@ class UnemploymentDataETL:
                 logger.info(f"添加缺失列 {col} 成功，默认值: {default_value}")
         return df
     
-    def process_province_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_output(self, name: str, file_path: str) -> Optional[pd.DataFrame]:
         """
-        处理省份失业率数据
+        按OUTPUT_SPECS中的规格处理一个输出
+        
+        共享扫描时直接在已解析的输入表上按计划选出行，过滤掩码由读取同一输入表的各输出共用；
+        否则单独读取输入表，流式读取时过滤条件在每个分块上提前应用。
         
         Args:
+            name: 输出名称
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
+        spec = self.OUTPUT_SPECS[name]
+        if "derived_from" in spec:
+            return self.derive_output(name, file_path)
+        column_mapping = self.COLUMN_MAPPINGS[name]
+        row_filter = self._source_filters(spec["filters"], column_mapping)
+        
+        with self._stage("process_output", output=name) as stage:
+            shared = self._source_cache.get(file_path)
+            if shared is not None:
+                masks = self._pass_masks.setdefault(file_path, {})
+            else:
+                shared = self.load_csv(file_path, row_filter=row_filter, usecols=self._source_columns(name),
+                                       min_date=self._date_floors.get(file_path))
+                if shared is None:
+                    return None
+                shared = self.clean_column_names(shared)
+                masks = {}
+            stage["rows_in"] = len(shared)
+            # take生成新的DataFrame: 处理器对列的重命名和赋值不会影响其他输出看到的共享数据
+            df = self._run_stage("filter", lambda frame: frame.take(self._plan_rows(frame, row_filter, masks)),
+                                 shared)
+            
+            df = self._run_stage("rename_columns", self.rename_columns, df, column_mapping)
+            
+            # 格式化日期
+            df = self._run_stage("format_date", self.format_date, df, date_col="Date")
+            
+            # 转换值列
+            df = self._run_stage("transform_value", self.transform_value, df, value_col="Value",
+                                 decimals_col=self.DECIMALS_COLUMN if self.round_values else None)
+            
+            # 派生列
+            df = self._run_stage("derive_columns", self._derive_columns, df, spec)
+            
+            # 选择列
+            df = self._run_stage("select_columns", self.select_columns, df, spec["columns"])
+            stage["rows_out"] = len(df)
         
-        # 清理列名
-        df = self.clean_column_names(df)
+        logger.info(f"处理{spec['label']}成功，共 {len(df)} 条记录")
+        return df
+    
+    def derive_output(self, name: str, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        由父输出的结果生成派生输出: 按规格过滤父输出的行，添加常量列并选择列
         
-        # 列映射 - 根据截图中的实际列名调整
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristic",
-            "Gender": "Sex",
-            "Age group": "Age",
-            "Statistics": "StatType",
-            "VALUE": "Value"
-        }
-        df = self.rename_columns(df, column_mapping)
+        父输出在本次运行中已处理时直接使用内存中的结果；否则（单独调用或父输出未变化而被跳过）先生成父输出。
         
-        # 过滤行 - 只保留失业率数据
-        filters = {
-            "Characteristic": ["Unemployment rate"]
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 为每个省份设置正确的GeoID
-        geo_id_mapping = {
-            "Canada": "01",
-            "Alberta": "48",
-            "British Columbia": "59",
-            "Manitoba": "46",
-            "New Brunswick": "13",
-            "Newfoundland and Labrador": "10",
-            "Nova Scotia": "12",
-            "Ontario": "35",
-            "Prince Edward Island": "11",
-            "Quebec": "24",
-            "Saskatchewan": "47"
-        }
-        df["GeoID"] = df["GeoName"].map(geo_id_mapping)
-        
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
-        df = self.select_columns(df, columns)
+        Args:
+            name: 派生输出名称
+            file_path: 父输出的CSV文件路径
+            
+        Returns:
+            处理后的DataFrame，如果处理失败则返回None
+        """
+        spec = self.OUTPUT_SPECS[name]
+        parent = spec["derived_from"]
+        with self._stage("derive_output", output=name) as stage:
+            data = self._parent_results.get(parent)
+            if data is None:
+                data = self.process_output(parent, file_path)
+                if data is None:
+                    return None
+            stage["rows_in"] = len(data)
+            # take生成新的DataFrame: 添加派生列不会影响父输出的结果
+            df = self._run_stage("filter", lambda frame: frame.take(self._plan_rows(frame, spec["filters"], {})),
+                                 data)
+            df = self._run_stage("derive_columns", self._derive_columns, df, spec)
+            df = self._run_stage("select_columns", self.select_columns, df, spec["columns"])
+            stage["rows_out"] = len(df)
+        
+        logger.info(f"由{self.OUTPUT_SPECS[parent]['label']}派生{spec['label']}成功，共 {len(df)} 条记录")
+        return df
+    
+    def _derive_columns(self, df: pd.DataFrame, spec: Dict[str, Any]) -> pd.DataFrame:
+        """
+        按输出规格添加分类代码、GeoID、常量和复制列
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理省份数据成功，共 {len(result)} 条记录")
-        return result
+        Args:
+            df: 输入DataFrame
+            spec: OUTPUT_SPECS中的输出规格
+            
+        Returns:
+            添加派生列后的DataFrame
+        """
+        for col, source_col in spec.get("classification_codes", {}).items():
+            df[col] = extract_classification_code(df[source_col], leading_digits=True)
+        if "geo_ids" in spec:
+            df["GeoID"] = self.map_categorical(df["GeoName"], spec["geo_ids"],
+                                               default=spec.get("geo_id_default", np.nan))
+        for col, value in spec.get("constants", {}).items():
+            df[col] = value
+        for col, source_col in spec.get("copies", {}).items():
+            df[col] = df[source_col]
+        return df
     
-    def process_alberta_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_province_data(self, file_path: str) -> Optional[pd.DataFrame]:
         """
-        处理艾伯塔省失业率数据
+        处理省份失业率数据
         
         Args:
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
-        
-        # 清理列名
-        df = self.clean_column_names(df)
-        
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristic",
-            "VALUE": "Value",
-            "Sex": "Sex",
-            "Age group": "Age"
-        }
-        df = self.rename_columns(df, column_mapping)
-        
-        # 过滤行 - 只保留艾伯塔省数据
-        filters = {
-            "GeoName": ["Alberta"]
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 添加GeoID
-        df["GeoID"] = 48
-        
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
-        df = self.select_columns(df, columns)
+        return self.process_output("province", file_path)
+    
+    def process_alberta_data(self, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        处理艾伯塔省失业率数据（由省份数据派生）
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理艾伯塔省数据成功，共 {len(result)} 条记录")
-        return result
+        Args:
+            file_path: 省份数据CSV文件路径
+            
+        Returns:
+            处理后的DataFrame，如果处理失败则返回None
+        """
+        return self.process_output("alberta", file_path)
     
-    def process_city_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_city_data(self, file_path: str) -> Optional[pd.DataFrame]:
         """
         处理城市失业率数据
         
@@ -318,59 +1262,11 @@ class UnemploymentDataETL:
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
-        
-        # 清理列名
-        df = self.clean_column_names(df)
-        
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristics",
-            "VALUE": "Value"
-        }
-        df = self.rename_columns(df, column_mapping)
-        
-        # 过滤行 - 只保留城市数据
-        city_list = ["Calgary", "Edmonton", "Vancouver", "Toronto", "Montreal", "Ottawa"]
-        filters = {
-            "GeoName": city_list,
-            "Characteristics": ["Unemployment rate"]
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 为每个城市设置GeoID
-        geo_id_mapping = {
-            "Calgary": "825",
-            "Edmonton": "835",
-            "Vancouver": "933",
-            "Toronto": "535",
-            "Montreal": "462",
-            "Ottawa": "505"
-        }
-        df["GeoID"] = df["GeoName"].map(geo_id_mapping)
-        
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristics", "Value"]
-        df = self.select_columns(df, columns)
-        
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理城市数据成功，共 {len(result)} 条记录")
-        return result
+        return self.process_output("city", file_path)
     
-    def process_industry_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_industry_data(self, file_path: str) -> Optional[pd.DataFrame]:
         """
         处理行业失业率数据
         
@@ -378,53 +1274,11 @@ class UnemploymentDataETL:
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
-        
-        # 清理列名
-        df = self.clean_column_names(df)
-        
-        # 列映射 - 根据截图中的实际列名调整
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "North American Industry Classification System (NAICS)": "NAICS Description",
-            "Labour force characteristics": "Characteristic",
-            "VALUE": "Value",
-            "Gender": "Sex",
-            "Age group": "Age"
-        }
-        df = self.rename_columns(df, column_mapping)
-        
-        # 过滤行 - 只保留失业率数据
-        filters = {
-            "Characteristic": ["Unemployment rate"]
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 添加缺失的列
-        df["GeoID"] = "2021A000011124"  # 加拿大的GeoID
-        df["NAICS"] = ""  # 空NAICS代码
-        
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "NAICS Description", "Characteristic", "Sex", "Age", "Value", "NAICS"]
-        df = self.select_columns(df, columns)
-        
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理行业数据成功，共 {len(result)} 条记录")
-        return result
+        return self.process_output("industry", file_path)
     
-    def process_occupation_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_occupation_data(self, file_path: str) -> Optional[pd.DataFrame]:
         """
         处理职业失业率数据
         
@@ -432,69 +1286,11 @@ class UnemploymentDataETL:
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
-        
-        # 清理列名
-        df = self.clean_column_names(df)
-        
-        # 列映射 - 根据截图中的实际列名调整
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "National Occupational Classification (NOC)": "NOC Description",
-            "Labour force characteristics": "Characteristics",
-            "VALUE": "Value",
-            "Sex": "Sex"
-        }
-        df = self.rename_columns(df, column_mapping)
-        
-        # 过滤行 - 只保留失业率数据和艾伯塔省数据
-        filters = {
-            "Characteristics": ["Unemployment rate", "Estimate"],
-            "GeoName": ["Alberta", "Canada"]
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 提取NOC代码 - 从职业描述中提取
-        # 例如: "Total employed, all occupations [00-95]" -> "00-95"
-        def extract_noc_code(description):
-            if description and isinstance(description, str):
-                import re
-                # 尝试提取方括号中的内容
-                match = re.search(r'\[(.*?)\]', description)
-                if match:
-                    return match.group(1)
-                # 如果没有方括号，尝试提取开头的数字部分
-                match = re.search(r'^(\d+(\-\d+)?)', description)
-                if match:
-                    return match.group(1)
-            return ""
-            
-        df["NOC"] = df["NOC Description"].apply(extract_noc_code)
-        
-        # 为艾伯塔省设置GeoID
-        df["GeoID"] = df["GeoName"].apply(lambda x: "48" if x == "Alberta" else "01")
-        
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristics", "NOC", "NOC Description", "Sex", "Value"]
-        df = self.select_columns(df, columns)
-        
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理职业数据成功，共 {len(result)} 条记录")
-        return result
+        return self.process_output("occupation", file_path)
     
-    def process_education_data(self, file_path: str) -> Optional[List[Dict]]:
+    def process_education_data(self, file_path: str) -> Optional[pd.DataFrame]:
         """
         处理教育程度失业率数据
         
@@ -502,247 +1298,753 @@ class UnemploymentDataETL:
             file_path: CSV文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            处理后的DataFrame，如果处理失败则返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
+        return self.process_output("education", file_path)
+    
+    def process_age_data(self, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        处理年龄组失业率数据
         
-        # 清理列名
-        df = self.clean_column_names(df)
+        Args:
+            file_path: CSV文件路径
+            
+        Returns:
+            处理后的DataFrame，如果处理失败则返回None
+        """
+        return self.process_output("age", file_path)
+    
+    def process_sex_data(self, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        处理性别失业率数据
         
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristics",
-            "Educational attainment": "Education",
-            "VALUE": "Value",
-            "Sex": "Sex",
-            "Age group": "Age"
-        }
-        df = self.rename_columns(df, column_mapping)
+        Args:
+            file_path: CSV文件路径
+            
+        Returns:
+            处理后的DataFrame，如果处理失败则返回None
+        """
+        return self.process_output("sex", file_path)
+    
+    def process_region_data(self, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        处理区域失业率数据
         
-        # 过滤行 - 只保留失业率数据
-        filters = {
-            "Characteristics": ["Unemployment rate"]
-        }
-        df = self.filter_rows(df, filters)
+        Args:
+            file_path: CSV文件路径
+            
+        Returns:
+            处理后的DataFrame，如果处理失败则返回None
+        """
+        return self.process_output("region", file_path)
+    
+    def save_to_json(self, data: Union[pd.DataFrame, List[Dict]], filename: str) -> str:
+        """
+        保存数据为JSON文件，确保没有NaN值（对React友好）
         
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
+        DataFrame直接按列数组分批流式写出（output_format为"columnar"时写出列式布局）；字典列表仍使用json.dump。
         
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
+        Args:
+            data: DataFrame或数据列表
+            filename: 输出文件名
+            
+        Returns:
+            JSON文件的完整路径
+        """
+        output_path = os.path.join(self.output_dir, filename)
+        
+        if isinstance(data, pd.DataFrame):
+            with self._stage("save_to_json", rows_in=len(data)), open(output_path, 'w', encoding='utf-8') as f:
+                if self.output_format == "columnar":
+                    write_json_columnar(data, f)
+                else:
+                    write_json_records(data, f, compact=self.compact_json)
+            logger.info(f"保存JSON文件成功: {output_path}")
+            return output_path
         
-        # 添加GeoID
-        df["GeoID"] = "01"  # 加拿大的GeoID
+        # 自定义JSON编码器，处理NaN和None
+        class NpEncoder(json.JSONEncoder):
+            def default(self, obj):
+                if isinstance(obj, np.integer):
+                    return int(obj)
+                if isinstance(obj, np.floating):
+                    return None if np.isnan(obj) else float(obj)
+                if isinstance(obj, np.ndarray):
+                    return obj.tolist()
+                return super(NpEncoder, self).default(obj)
         
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristics", "Education", "Sex", "Age", "Value"]
-        df = self.select_columns(df, columns)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            if self.compact_json:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'), cls=NpEncoder)
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=2, cls=NpEncoder)
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理教育程度数据成功，共 {len(result)} 条记录")
-        return result
+        logger.info(f"保存JSON文件成功: {output_path}")
+        return output_path
     
-    def process_age_data(self, file_path: str) -> Optional[List[Dict]]:
+    def _matches_kind(self, series: pd.Series, kind: str) -> bool:
         """
-        处理年龄组失业率数据
+        判断列的取值是否都属于给定类型，分类列检查其类别，object列由pandas在C层逐值推断
         
         Args:
-            file_path: CSV文件路径
+            series: 输入列
+            kind: "string"或"numeric"
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            是否匹配
         """
-        df = self.load_csv(file_path)
-        if df is None:
-            return None
+        values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if kind == "numeric":
+            return inferred in ("floating", "integer", "mixed-integer-float", "decimal", "empty")
+        return inferred in ("string", "empty")
+    
+    def validate_output(self, data: pd.DataFrame, name: str) -> None:
+        """
+        按DEFAULT_VALIDATION和VALIDATION_RULES校验一个输出: 必需列、列类型、允许值、缺失比例、日期格式、
+        Value取值范围和键的唯一性。维度列只检查不同的值，其余检查均为整列的向量化运算
         
-        # 清理列名
-        df = self.clean_column_names(df)
+        Args:
+            data: 输出DataFrame
+            name: 输出名称
+            
+        Raises:
+            DataValidationError: 有检查未通过
+        """
+        spec = self.OUTPUT_SPECS[name]
+        rules = dict(self.DEFAULT_VALIDATION, **self.VALIDATION_RULES.get(name, {}))
+        columns = set(data.columns)
+        failures = []
+        
+        unique_keys = rules["unique_keys"] or []
+        missing = [col for col in dict.fromkeys(rules["required"] + unique_keys) if col not in columns]
+        if missing:
+            failures.append(f"缺少必需的列 {missing}")
+        
+        for col, kind in rules["dtypes"].items():
+            if col in columns and not self._matches_kind(data[col], kind):
+                failures.append(f"列 {col} 不是{'字符串' if kind == 'string' else '数值'}类型（{data[col].dtype}）")
+        
+        if len(data):
+            for col, limit in rules["max_null_rate"].items():
+                if col in columns:
+                    rate = float(data[col].isna().mean())
+                    if rate > limit:
+                        failures.append(f"列 {col} 的缺失比例 {rate:.1%} 超过上限 {limit:.1%}")
+        
+        allowed = dict(spec["filters"], **rules["allowed_values"])
+        for col, values in allowed.items():
+            if col in columns:
+                codes, uniques = factorize_values(data[col])
+                present = uniques.take(np.unique(codes[codes >= 0]))
+                unexpected = sorted(str(value) for value in present.difference(pd.Index(values)))
+                if unexpected:
+                    failures.append(f"列 {col} 包含不允许的值 {unexpected[:5]}")
+        
+        if "Date" in columns:
+            codes, uniques = factorize_values(data["Date"])
+            present = pd.Index(uniques.take(np.unique(codes[codes >= 0])).astype(str))
+            invalid = present[pd.to_datetime(present, format=ISO_DATE_FORMAT, errors="coerce").isna()]
+            if len(invalid):
+                failures.append(f"Date列包含不符合{ISO_DATE_FORMAT}格式的值 {invalid[:5].tolist()}")
+        
+        low, high = rules["value_range"]
+        if "Value" in columns:
+            values = pd.to_numeric(data["Value"], errors="coerce")
+            out_of_range = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                out_of_range |= (values < low).to_numpy(dtype=bool, na_value=False)
+            if high is not None:
+                out_of_range |= (values > high).to_numpy(dtype=bool, na_value=False)
+            if out_of_range.any():
+                failures.append(f"{int(out_of_range.sum())} 个Value超出范围 [{low}, {high}]，"
+                                f"实际范围 [{values.min()}, {values.max()}]")
+        
+        if unique_keys and not missing:
+            duplicated = int(data.duplicated(unique_keys).sum())
+            if duplicated:
+                failures.append(f"{duplicated} 行的键 {unique_keys} 重复")
+        
+        if failures:
+            raise DataValidationError(name, failures)
+        logger.info(f"{spec['label']}通过数据校验")
+    
+    def publish_output(self, data: pd.DataFrame, name: str,
+                       filename: str) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """
+        校验并写出一个输出及其图表数据和时间范围分片；校验未通过时不写出任何文件
         
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristic",
-            "VALUE": "Value",
-            "Sex": "Sex",
-            "Age group": "Age"
-        }
-        df = self.rename_columns(df, column_mapping)
+        Args:
+            data: 输出DataFrame
+            name: 输出名称
+            filename: 输出文件名
+            
+        Returns:
+            (JSON文件路径, 分片描述列表或None)
+            
+        Raises:
+            DataValidationError: 输出未通过数据校验
+        """
+        if self.validate:
+            with self._stage("validate", rows_in=len(data)):
+                self.validate_output(data, name)
+        output_path = self.save_to_json(data, filename)
+        self.save_chart_series(data, name)
+        self.save_summary(data, name)
+        return output_path, self.save_timeframe_shards(data, name)
+    
+    def build_chart_rows(self, data: pd.DataFrame, name: str) -> List[Dict[str, Any]]:
+        """
+        按CHART_SPECS把一个输出透视为图表用的宽表
         
-        # 过滤行 - 只保留失业率数据和全国数据
-        filters = {
-            "Characteristic": ["Unemployment rate"],
-            "GeoName": ["Canada"]
-        }
-        df = self.filter_rows(df, filters)
+        与客户端处理函数的语义保持一致: 按月分组，每组的date取该月第一条记录的日期；同一月份同一系列出现多次时
+        取最后一条记录的值，系列列的顺序为首次出现的顺序；系列名为空（或缺少系列列）的记录只创建月份行；
+        缺少过滤列时不保留任何记录；结果按日期稳定排序。
         
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
+        Args:
+            data: 输出DataFrame（包含Date和Value列）
+            name: 输出名称
+            
+        Returns:
+            宽表行列表
+        """
+        chart = self.CHART_SPECS[name]
+        mask = data["Date"].notna().to_numpy().copy()
+        for col, values in chart["filters"].items():
+            mask &= column_mask(data[col], values) if col in data.columns else False
+        selected = data[mask]
+        series_col = chart["series"]
+        series_values = selected[series_col].tolist() if series_col in selected.columns else [None] * len(selected)
+        
+        rows: Dict[str, Dict[str, Any]] = {}
+        for date, series, value in zip(selected["Date"].astype(str).tolist(), series_values,
+                                       selected["Value"].to_numpy(dtype=object, na_value=None).tolist()):
+            month = date[:7]
+            row = rows.get(month)
+            if row is None:
+                row = rows[month] = {"date": date, "formattedDate": month}
+            if isinstance(series, str) and series:
+                row[series] = None if value is None or value != value else value
+        return sorted(rows.values(), key=lambda row: row["date"])
+    
+    def save_chart_series(self, data: pd.DataFrame, name: str) -> Optional[str]:
+        """
+        为有图表规格的输出写出图表宽表（CHART_DIR子目录下与输出同名的文件）
         
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
+        Args:
+            data: 输出DataFrame
+            name: 输出名称
+            
+        Returns:
+            图表文件路径，该输出没有图表规格时返回None
+        """
+        if name not in self.CHART_SPECS:
+            return None
+        with self._stage("save_chart_series", rows_in=len(data)) as stage:
+            rows = self.build_chart_rows(data, name)
+            stage["rows_out"] = len(rows)
+            chart_path = self._chart_path(name)
+            os.makedirs(os.path.dirname(chart_path), exist_ok=True)
+            with open(chart_path, 'w', encoding='utf-8') as f:
+                if self.compact_json:
+                    json.dump(rows, f, ensure_ascii=False, separators=(',', ':'))
+                else:
+                    json.dump(rows, f, ensure_ascii=False, indent=2)
+        logger.info(f"保存图表数据成功: {chart_path}，共 {len(rows)} 个月份")
+        return chart_path
+    
+    def _chart_path(self, name: str) -> str:
+        """返回输出对应的图表文件路径"""
+        return os.path.join(self.output_dir, self.CHART_DIR, self.OUTPUT_SPECS[name]["filename"])
+    
+    def build_summary(self, data: pd.DataFrame, name: str) -> Dict[str, Any]:
+        """
+        生成一个输出的摘要（格式见SUMMARY_DIR处的说明）
         
-        # 添加GeoID
-        df["GeoID"] = "01"  # 加拿大的GeoID
+        维度列按编码分组，每列只转换一次不同值；系列统计为一次groupby，系列按键值排序，最新值取日期最大的非空值
+        （同一日期出现多次时取最后一条记录）。缺失的维度值在系列键中为null，不计入不同值。
         
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristic", "Sex", "Age", "Value"]
-        df = self.select_columns(df, columns)
+        Args:
+            data: 输出DataFrame（包含Date和Value列）
+            name: 输出名称
+            
+        Returns:
+            摘要字典
+        """
+        copies = self.OUTPUT_SPECS[name].get("copies", {})
+        dims = [col for col in data.columns if col not in ("Date", "Value") and col not in copies]
+        
+        def scalar(value: Any) -> Any:
+            return value.item() if isinstance(value, np.generic) else value
+        
+        frame = pd.DataFrame(index=range(len(data)))
+        lookups = {}
+        dimensions = {}
+        for col in dims:
+            codes, uniques = factorize_values(data[col])
+            frame[col] = codes
+            lookups[col] = [scalar(value) for value in uniques]
+            present = np.unique(codes[codes >= 0])
+            dimensions[col] = sorted((lookups[col][code] for code in present), key=str)
+        frame["Date"] = data["Date"].to_numpy(dtype=object, na_value=None)
+        frame["Value"] = pd.to_numeric(data["Value"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        present_dates = frame["Date"].dropna()
+        coverage = {"start": present_dates.min() if len(present_dates) else None,
+                    "end": present_dates.max() if len(present_dates) else None,
+                    "count": int(present_dates.nunique())}
+        
+        series = []
+        if len(frame):
+            # 没有维度列时整个输出为一个系列
+            keys = dims or ["_all"]
+            if not dims:
+                frame["_all"] = 0
+            stats = frame.groupby(keys, sort=True).agg(count=("Value", "count"), min=("Value", "min"),
+                                                       max=("Value", "max"), start=("Date", "min"),
+                                                       end=("Date", "max"))
+            valued = frame[frame["Value"].notna() & frame["Date"].notna()]
+            latest = valued.sort_values("Date", kind="stable").groupby(keys, sort=False).tail(1)
+            latest_by_key = dict(zip(latest[keys].itertuples(index=False, name=None),
+                                     zip(latest["Value"].tolist(), latest["Date"].tolist())))
+            for key, row in zip(stats.index.to_flat_index(), stats.itertuples(index=False)):
+                key = key if isinstance(key, tuple) else (key,)
+                last, last_date = latest_by_key.get(key, (None, None))
+                series.append({
+                    "key": {col: lookups[col][code] if code >= 0 else None for col, code in zip(dims, key)},
+                    "count": int(row.count),
+                    "min": None if pd.isna(row.min) else float(row.min),
+                    "max": None if pd.isna(row.max) else float(row.max),
+                    "last": last,
+                    "last_date": last_date,
+                    "start": row.start if isinstance(row.start, str) else None,
+                    "end": row.end if isinstance(row.end, str) else None
+                })
+            # 分组顺序取决于列是否为分类类型，按键值排序使各模式输出一致
+            series.sort(key=lambda item: [(value is not None, str(value)) for value in item["key"].values()])
+        
+        return {
+            "format": self.SUMMARY_FORMAT,
+            "output": name,
+            "rows": len(data),
+            "dates": coverage,
+            "dimensions": dimensions,
+            "series": series
+        }
+    
+    def save_summary(self, data: pd.DataFrame, name: str) -> str:
+        """
+        写出一个输出的摘要文件（SUMMARY_DIR子目录下与输出同名的文件）
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理年龄组数据成功，共 {len(result)} 条记录")
-        return result
+        Args:
+            data: 输出DataFrame
+            name: 输出名称
+            
+        Returns:
+            摘要文件路径
+        """
+        with self._stage("save_summary", rows_in=len(data)) as stage:
+            summary = self.build_summary(data, name)
+            stage["rows_out"] = len(summary["series"])
+            summary_path = self._summary_path(name)
+            os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                if self.compact_json:
+                    json.dump(summary, f, ensure_ascii=False, separators=(',', ':'))
+                else:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"保存输出摘要成功: {summary_path}，共 {len(summary['series'])} 个系列")
+        return summary_path
     
-    def process_sex_data(self, file_path: str) -> Optional[List[Dict]]:
+    def _summary_path(self, name: str) -> str:
+        """返回输出对应的摘要文件路径"""
+        return os.path.join(self.output_dir, self.SUMMARY_DIR, self.OUTPUT_SPECS[name]["filename"])
+    
+    def save_timeframe_shards(self, data: pd.DataFrame, name: str) -> Optional[List[Dict[str, Any]]]:
         """
-        处理性别失业率数据
+        按TIMEFRAME_SHARDS把一个输出分片写出，并删除该输出不再使用的旧分片
         
         Args:
-            file_path: CSV文件路径
+            data: 输出DataFrame
+            name: 输出名称
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            分片描述列表（从新到旧），未启用分片时返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
+        if not self.timeframe_shards:
             return None
+        with self._stage("save_timeframe_shards", rows_in=len(data)) as stage:
+            shard_dir = os.path.join(self.output_dir, self.SHARD_DIR, name)
+            os.makedirs(shard_dir, exist_ok=True)
+            dates = data["Date"].astype(object)
+            latest = self._latest_date(data)
+            latest_month = pd.Period(latest, "M") if latest else None
+            assigned = np.zeros(len(data), dtype=bool)
+            shards = []
+            for timeframe, months in self.TIMEFRAME_SHARDS:
+                if months is None or latest_month is None:
+                    # 最后一个分片包含其余全部数据，包括日期缺失的行
+                    mask = ~assigned
+                else:
+                    lower = (latest_month - (months - 1)).to_timestamp().strftime(ISO_DATE_FORMAT)
+                    mask = (dates >= lower).to_numpy(dtype=bool) & ~assigned
+                assigned |= mask
+                if mask.any():
+                    part = data[mask]
+                    path = self.save_to_json(part, os.path.join(self.SHARD_DIR, name, f"{timeframe}.json"))
+                    part_dates = part["Date"].dropna()
+                    shards.append({
+                        "timeframe": timeframe,
+                        "file": f"{name}/{timeframe}.json",
+                        "start": str(part_dates.min()) if len(part_dates) else None,
+                        "end": str(part_dates.max()) if len(part_dates) else None,
+                        "rows": int(len(part)),
+                        "bytes": os.path.getsize(path)
+                    })
+                if months is None or latest_month is None:
+                    break
+            
+            current = {os.path.basename(shard["file"]) for shard in shards}
+            suffixes = tuple(suffix for _, suffix in PRECOMPRESSED_ENCODINGS)
+            for stale in os.listdir(shard_dir):
+                base = stale[:-len(os.path.splitext(stale)[1])] if stale.endswith(suffixes) else stale
+                if base.endswith(".json") and base not in current:
+                    os.remove(os.path.join(shard_dir, stale))
+            stage["rows_out"] = sum(shard["rows"] for shard in shards)
+        return shards
+    
+    def _load_shard_manifest(self) -> Dict[str, Any]:
+        """
+        读取分片清单
         
-        # 清理列名
-        df = self.clean_column_names(df)
+        Returns:
+            分片清单，文件不存在或无法解析时返回空清单
+        """
+        path = os.path.join(self.output_dir, self.SHARD_DIR, self.SHARD_MANIFEST)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("datasets"), dict):
+                return manifest
+        except (OSError, ValueError, AttributeError) as e:
+            if os.path.exists(path):
+                logger.warning(f"分片清单 {path} 无法读取，将重新生成: {e}")
+        return {"datasets": {}}
+    
+    def _save_shard_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        写出分片清单，只保留OUTPUT_SPECS中仍存在的输出
         
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristic",
-            "VALUE": "Value",
-            "Sex": "Series"
-        }
-        df = self.rename_columns(df, column_mapping)
+        Args:
+            manifest: 分片清单
+        """
+        datasets = {name: manifest["datasets"][name] for name in self.OUTPUT_SPECS if name in manifest["datasets"]}
+        path = os.path.join(self.output_dir, self.SHARD_DIR, self.SHARD_MANIFEST)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"format": "timeframe-shards-v1", "timeframes": [tf for tf, _ in self.TIMEFRAME_SHARDS],
+                       "datasets": datasets}, f, ensure_ascii=False, indent=2)
+    
+    def _precompress_outputs(self, names: List[str], output_files: Dict[str, str],
+                             shard_manifest: Dict[str, Any]) -> None:
+        """
+        为各输出及其图表文件、摘要、分片和分片清单生成.gz和.br兄弟文件，已是最新的兄弟文件不会重新压缩
         
-        # 过滤行 - 只保留失业率数据和全国数据
-        filters = {
-            "Characteristic": ["Unemployment rate"],
-            "GeoName": ["Canada"]
-        }
-        df = self.filter_rows(df, filters)
+        Args:
+            names: 输出名称
+            output_files: 各输出的JSON文件路径
+            shard_manifest: 分片清单
+        """
+        shard_root = os.path.join(self.output_dir, self.SHARD_DIR)
+        paths = [output_files[name] for name in names if name in output_files]
+        paths += [self._chart_path(name) for name in names if name in self.CHART_SPECS]
+        paths += [self._summary_path(name) for name in names]
+        for name in names:
+            dataset = shard_manifest["datasets"].get(name, {})
+            paths += [os.path.join(shard_root, shard["file"]) for shard in dataset.get("shards", [])]
+        paths.append(os.path.join(shard_root, self.SHARD_MANIFEST))
+        paths = [path for path in paths if os.path.exists(path)]
+        
+        with self._stage("precompress", rows_in=len(paths)):
+            results = precompress_files(paths)
+        raw = sum(result["raw_bytes"] for result in results)
+        sizes = ", ".join(f"{encoding} {sum(result.get(f'{encoding}_bytes', 0) for result in results) / 2 ** 20:.1f} MB"
+                          for encoding, _ in PRECOMPRESSED_ENCODINGS if any(f"{encoding}_bytes" in r for r in results))
+        logger.info(f"预压缩 {len(results)} 个文件完成: 原始 {raw / 2 ** 20:.1f} MB, {sizes}")
+    
+    def _settings(self) -> Dict[str, Any]:
+        """
+        返回重建同等配置的ETL处理器所需的参数（用于并行模式的工作进程）
         
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
+        Returns:
+            构造函数参数字典
+        """
+        return {
+            "input_dir": self.input_dir,
+            "output_dir": self.output_dir,
+            "memory_budget_mb": self.memory_budget_mb,
+            "compact_json": self.compact_json,
+            "output_format": self.output_format,
+            "cache_dir": self.cache_dir,
+            "cache_max_mb": self.cache_max_mb,
+            "profile_dir": self.profile_dir,
+            "profile_memory": self.profile_memory,
+            "timeframe_shards": self.timeframe_shards,
+            "precompress": self.precompress,
+            "validate": self.validate,
+            "csv_engine": self.csv_engine,
+            "round_values": self.round_values
+        }
+    
+    def _output_registry(self, province_file: str, industry_file: str, occupation_file: str) -> List[Tuple]:
+        """
+        根据OUTPUT_SPECS生成输出注册表: (输出名称, 输入文件, 处理方法, 输出文件名)，同一输入文件的输出相邻排列
         
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
+        Args:
+            province_file: 省份数据CSV文件
+            industry_file: 行业数据CSV文件
+            occupation_file: 职业数据CSV文件
+            
+        Returns:
+            输出注册表
+        """
+        files = {"province": province_file, "industry": industry_file, "occupation": occupation_file}
+        registry = [(name, files[self.OUTPUT_SPECS[self._scanned_output(name)]["source"]],
+                     partial(self.process_output, name), spec["filename"])
+                    for name, spec in self.OUTPUT_SPECS.items()]
+        # 按输入文件分组，组内保持规格的声明顺序
+        first_seen = {}
+        for index, (_, source, _, _) in enumerate(registry):
+            first_seen.setdefault(source, index)
+        return sorted(registry, key=lambda entry: first_seen[entry[1]])
+    
+    def _shared_usecols(self, outputs: List[Tuple], source: str) -> List[str]:
+        """
+        计算读取同一输入文件的所有输出所需列的并集
         
-        # 添加labels列（与Date相同）
-        df["labels"] = df["Date"]
+        Args:
+            outputs: 输出注册表
+            source: 输入文件
+            
+        Returns:
+            原始列名列表
+        """
+        return sorted({col for name, other_source, _, _ in outputs if other_source == source
+                       for col in self._source_columns(name)})
+    
+    def _source_columns(self, name: str) -> List[str]:
+        """
+        输出需要读取的原始列: 列映射中的列，舍入Value时另加DECIMALS列；派生输出取其父输出的列
         
-        # 选择列
-        columns = ["Date", "Value", "Series", "labels"]
-        df = self.select_columns(df, columns)
+        Args:
+            name: 输出名称
+            
+        Returns:
+            原始列名列表
+        """
+        columns = list(self.COLUMN_MAPPINGS[self._scanned_output(name)])
+        if self.round_values and self.DECIMALS_COLUMN not in columns:
+            columns.append(self.DECIMALS_COLUMN)
+        return columns
+    
+    def _scanned_output(self, name: str) -> str:
+        """
+        返回读取输入表时代表该输出的输出名称: 派生输出为其父输出，其余为自身
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理性别数据成功，共 {len(result)} 条记录")
-        return result
+        Args:
+            name: 输出名称
+            
+        Returns:
+            输出名称
+        """
+        return self.OUTPUT_SPECS[name].get("derived_from", name)
+    
+    def _log_timings(self) -> None:
+        """输出各输出的处理耗时"""
+        for name, seconds in sorted(self.last_run_timings.items(), key=lambda item: -item[1]):
+            logger.info(f"输出 {name} 耗时 {seconds:.2f} 秒")
     
-    def process_region_data(self, file_path: str) -> Optional[List[Dict]]:
+    def _log_sizes(self) -> None:
+        """输出重新生成的各输出文件与上一版本相比的大小变化"""
+        compared = {name: sizes for name, sizes in self.last_run_sizes.items()
+                    if sizes["before"] is not None and sizes["after"] is not None}
+        for name, sizes in compared.items():
+            logger.info(f"输出 {name} 大小: {sizes['before'] / 1024:.1f} KB -> {sizes['after'] / 1024:.1f} KB")
+        before = sum(sizes["before"] for sizes in compared.values())
+        after = sum(sizes["after"] for sizes in compared.values())
+        if before:
+            logger.info(f"重新生成的 {len(compared)} 个输出共 {before / 1024:.1f} KB -> {after / 1024:.1f} KB，"
+                        f"减少 {(before - after) / 1024:.1f} KB（{(before - after) / before:.1%}）")
+    
+    @staticmethod
+    def _file_size(path: str) -> Optional[int]:
+        """返回文件大小，文件不存在时返回None"""
+        return os.path.getsize(path) if os.path.exists(path) else None
+    
+    def _file_digest(self, path: str) -> Optional[str]:
         """
-        处理区域失业率数据
+        分块计算文件的SHA-256哈希
         
         Args:
-            file_path: CSV文件路径
+            path: 文件路径
             
         Returns:
-            处理后的数据列表，如果处理失败则返回None
+            十六进制哈希字符串，文件不存在时返回None
         """
-        df = self.load_csv(file_path)
-        if df is None:
+        if not os.path.exists(path):
             return None
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._digest_memo:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._digest_memo[memo_key] = digest.hexdigest()
+        return self._digest_memo[memo_key]
+    
+    def _code_version(self) -> str:
+        """
+        计算ETL代码版本（本脚本与共用工具模块源码的哈希）
         
-        # 清理列名
-        df = self.clean_column_names(df)
-        
-        # 列映射
-        column_mapping = {
-            "REF_DATE": "Date",
-            "GEO": "GeoName",
-            "Labour force characteristics": "Characteristics",
-            "VALUE": "Value"
-        }
-        df = self.rename_columns(df, column_mapping)
+        Returns:
+            十六进制哈希字符串
+        """
+        digest = hashlib.sha256()
+        for path in (os.path.abspath(__file__), os.path.abspath(statcan_common.__file__)):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+    
+    def _output_fingerprint(self, name: str, filename: str, source_hash: Optional[str],
+                            code_version: str) -> Dict[str, Optional[str]]:
+        """
+        生成单个输出的构建指纹
         
-        # 过滤行 - 只保留失业率数据和艾伯塔省区域数据
-        alberta_regions = ["Calgary", "Edmonton", "Lethbridge-Medicine Hat", "Camrose-Drumheller", "Red Deer", "Northeast"]
-        filters = {
-            "Characteristics": ["Unemployment rate"],
-            "GeoName": alberta_regions
-        }
-        df = self.filter_rows(df, filters)
-        
-        # 格式化日期
-        df = self.format_date(df, date_col="Date")
-        
-        # 转换值列
-        df = self.transform_value(df, value_col="Value")
-        
-        # 为每个区域设置GeoID
-        geo_id_mapping = {
-            "Calgary": 4830,
-            "Edmonton": 4835,
-            "Lethbridge-Medicine Hat": 4810,
-            "Camrose-Drumheller": 4840,
-            "Red Deer": 4820,
-            "Northeast": 5980
+        Args:
+            name: 输出名称
+            filename: 输出文件名
+            source_hash: 输入文件哈希
+            code_version: ETL代码版本
+            
+        Returns:
+            指纹字典
+        """
+        scanned = self._scanned_output(name)
+        config = {
+            "output": name,
+            "filename": filename,
+            "column_mapping": self.COLUMN_MAPPINGS[scanned],
+            "spec": self.OUTPUT_SPECS[name],
+            "parent_spec": self.OUTPUT_SPECS[scanned] if scanned != name else None,
+            "compact_json": self.compact_json,
+            "output_format": self.output_format,
+            "round_values": self.round_values
         }
-        df["GeoID"] = df["GeoName"].map(geo_id_mapping)
+        config_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+        return {"source_hash": source_hash, "config_hash": config_hash, "code_version": code_version}
+    
+    def _load_manifest(self) -> Dict[str, Dict]:
+        """
+        读取构建清单
         
-        # 选择列
-        columns = ["Date", "GeoID", "GeoName", "Characteristics", "Value"]
-        df = self.select_columns(df, columns)
+        Returns:
+            {输出名称: 清单条目}，清单不存在或无法解析时返回空字典
+        """
+        path = os.path.join(self.output_dir, self.MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("outputs", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"构建清单 {path} 无法读取，将重新生成所有输出: {e}")
+            return {}
+    
+    def _save_manifest(self, entries: Dict[str, Dict]) -> None:
+        """
+        原子地写出构建清单
         
-        # 转换为字典列表
-        result = df.to_dict(orient="records")
-        logger.info(f"处理区域数据成功，共 {len(result)} 条记录")
-        return result
+        Args:
+            entries: {输出名称: 清单条目}
+        """
+        path = os.path.join(self.output_dir, self.MANIFEST_FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"outputs": entries}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
     
-    def save_to_json(self, data: List[Dict], filename: str) -> str:
+    def _latest_date(self, data: pd.DataFrame) -> Optional[str]:
         """
-        保存数据为JSON文件，确保没有NaN值（对React友好）
+        返回输出数据中最新的日期
         
         Args:
-            data: 数据列表
-            filename: 输出文件名
+            data: 处理后的DataFrame
             
         Returns:
-            JSON文件的完整路径
+            ISO日期字符串，没有有效日期时返回None
         """
-        output_path = os.path.join(self.output_dir, filename)
+        dates = data["Date"].dropna() if "Date" in data.columns else []
+        return str(dates.max()) if len(dates) else None
+    
+    def _incremental_cutoff(self, entry: Optional[Dict], fingerprint: Dict[str, Optional[str]],
+                            output_path: str, revision_months: int) -> Optional[str]:
+        """
+        计算输出的增量更新截止日期: 早于该日期的历史记录保留，其余从输入文件重新生成
         
-        # 自定义JSON编码器，处理NaN和None
-        class NpEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if isinstance(obj, np.integer):
-                    return int(obj)
-                if isinstance(obj, np.floating):
-                    return None if np.isnan(obj) else float(obj)
-                if isinstance(obj, np.ndarray):
-                    return obj.tolist()
-                return super(NpEncoder, self).default(obj)
+        只有处理配置和代码版本未变化、输出文件未被改动且清单记录了最新日期时才能增量更新。
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, cls=NpEncoder)
+        Args:
+            entry: 上一次运行的清单条目
+            fingerprint: 本次运行的构建指纹
+            output_path: 输出文件路径
+            revision_months: 需要重新生成的最近月份数（StatCan会修订最近几个月的数据）
+            
+        Returns:
+            截止日期（ISO日期字符串），需要完整重新生成时返回None
+        """
+        if entry is None or not entry.get("latest_date"):
+            return None
+        if any(entry.get(key) != fingerprint[key] for key in ("config_hash", "code_version")):
+            return None
+        if entry.get("output_hash") != self._file_digest(output_path):
+            return None
+        latest = pd.Timestamp(entry["latest_date"]).to_period("M")
+        return (latest - (revision_months - 1)).to_timestamp().strftime(ISO_DATE_FORMAT)
+    
+    def _merge_incremental(self, data: pd.DataFrame, output_path: str, cutoff: str) -> pd.DataFrame:
+        """
+        将新生成的记录合并到已有输出: 保留早于截止日期的历史记录，其后接上截止日期及之后的新记录
         
-        logger.info(f"保存JSON文件成功: {output_path}")
-        return output_path
+        Args:
+            data: 处理器生成的记录（只包含增量读取的行）
+            output_path: 已有输出文件路径
+            cutoff: 截止日期
+            
+        Returns:
+            合并后的DataFrame，历史记录整体早于新记录，因此直接拼接即保持日期顺序
+        """
+        with open(output_path, 'r', encoding='utf-8') as f:
+            # object类型保留null与NaN的区别，写出时与原文件一致
+            existing = pd.DataFrame(json.load(f), dtype=object)
+        if existing.empty:
+            return data
+        dates = existing["Date"]
+        kept = existing[(dates.where(dates.notna(), "") < cutoff).to_numpy()]
+        data = data[(data["Date"].fillna("") >= cutoff).to_numpy()]
+        logger.info(f"增量更新 {os.path.basename(output_path)}: 保留 {len(kept)} 条历史记录，"
+                    f"重新生成 {cutoff} 之后的 {len(data)} 条记录")
+        kept = kept.reindex(columns=data.columns)
+        for col in data.columns:
+            if isinstance(data[col].dtype, pd.Float64Dtype):
+                # 历史记录中的null转换为缺失值，拼接后值列仍为可空浮点类型
+                kept[col] = pd.to_numeric(kept[col], errors="coerce").astype(data[col].dtype)
+        return pd.concat([kept, data], ignore_index=True)
     
-    def run_etl_pipeline(self, province_file: str, industry_file: str, occupation_file: str) -> Dict[str, str]:
+    def run_etl_pipeline(self, province_file: str, industry_file: str, occupation_file: str,
+                         shared_scan: bool = True, workers: int = 1,
+                         skip_unchanged: bool = True, incremental: bool = False,
+                         revision_months: int = 3) -> Dict[str, str]:
         """
         运行完整的ETL管道
         
@@ -750,73 +2052,378 @@ class UnemploymentDataETL:
             province_file: 省份数据CSV文件
             industry_file: 行业数据CSV文件
             occupation_file: 职业数据CSV文件
+            shared_scan: 是否启用共享扫描模式，每个输入文件只解析一次并分发给所有使用它的输出
+            workers: 工作进程数，大于1时各输出在进程池中并行处理
+            skip_unchanged: 是否跳过输入文件、处理配置和代码版本均未变化且输出文件未被改动的输出
+            incremental: 是否启用增量更新模式，只读取比已有输出更新的行并合并到已有输出中
+            revision_months: 增量模式下重新生成的最近月份数，用于吸收StatCan对最近数据的修订；为0时只追加新月份
             
         Returns:
             JSON文件路径字典
         """
+        if self.profiler is None:
+            return self._run_pipeline(province_file, industry_file, occupation_file, shared_scan, workers,
+                                      skip_unchanged, incremental, revision_months)
+        self.profiler.reset()
+        try:
+            with self.profiler.stage("run_etl_pipeline"):
+                return self._run_pipeline(province_file, industry_file, occupation_file, shared_scan, workers,
+                                          skip_unchanged, incremental, revision_months)
+        finally:
+            self._write_profile()
+    
+    def _run_pipeline(self, province_file: str, industry_file: str, occupation_file: str, shared_scan: bool,
+                      workers: int, skip_unchanged: bool, incremental: bool,
+                      revision_months: int) -> Dict[str, str]:
+        """run_etl_pipeline的实现，参数和返回值同run_etl_pipeline"""
+        registry = self._output_registry(province_file, industry_file, occupation_file)
+        self.last_run_timings = {}
+        self._latest_dates = {}
+        
+        # 计算每个输出的构建指纹，每个输入文件只哈希一次
+        code_version = self._code_version()
+        source_hashes = {}
+        for _, source, _, _ in registry:
+            if source not in source_hashes:
+                full_path = os.path.join(self.input_dir, source) if not os.path.isabs(source) else source
+                source_hashes[source] = self._file_digest(full_path)
+        fingerprints = {name: self._output_fingerprint(name, filename, source_hashes[source], code_version)
+                        for name, source, _, filename in registry}
+        
+        manifest = self._load_manifest()
+        shard_manifest = self._load_shard_manifest()
+        self._shards = {}
         output_files = {}
+        outputs = []
+        for name, source, processor, filename in registry:
+            entry = manifest.get(name)
+            output_path = os.path.join(self.output_dir, filename)
+            if (skip_unchanged and entry is not None and fingerprints[name]["source_hash"] is not None
+                    and all(entry.get(key) == value for key, value in fingerprints[name].items())
+                    and entry.get("output_hash") == self._file_digest(output_path)
+                    and (name not in self.CHART_SPECS or os.path.exists(self._chart_path(name)))
+                    and os.path.exists(self._summary_path(name))
+                    and (not self.timeframe_shards or name in shard_manifest["datasets"])):
+                output_files[name] = output_path
+                logger.info(f"输出 {name} 的输入和配置均未变化，跳过重新生成")
+            else:
+                outputs.append((name, source, processor, filename))
+        
+        cutoffs: Dict[str, str] = {}
+        if incremental:
+            cutoffs = self._plan_incremental(outputs, manifest, fingerprints, revision_months)
+            if workers > 1:
+                logger.warning("增量模式暂不支持并行处理，将在当前进程中依次处理")
+                workers = 1
+        
+        sizes_before = {name: self._file_size(os.path.join(self.output_dir, filename))
+                        for name, _, _, filename in outputs}
+        self.last_run_sizes = {}
+        try:
+            if workers > 1:
+                produced = self._run_parallel(outputs, workers)
+            else:
+                produced = self._run_sequential(outputs, shared_scan, cutoffs)
+        except DataValidationError:
+            # 校验失败前已写出的输出不会回滚，需要更新它们的分片清单并刷新预压缩文件，避免.gz/.br与新的JSON文件不一致
+            self._finish_failed_run(registry, shard_manifest)
+            raise
+        finally:
+            self._date_floors.clear()
+        
+        self.last_run_sizes = {name: {"before": sizes_before.get(name), "after": self._file_size(output_path)}
+                               for name, output_path in produced.items()}
+        self._log_sizes()
+        
+        # 更新构建清单
+        for name, output_path in produced.items():
+            manifest[name] = dict(fingerprints[name], output=os.path.basename(output_path),
+                                  output_hash=self._file_digest(output_path),
+                                  latest_date=self._latest_dates.get(name))
+        if produced:
+            self._save_manifest(manifest)
+        if self._shards:
+            for name, shards in self._shards.items():
+                shard_manifest["datasets"][name] = {"format": self.output_format,
+                                                    "latest_date": self._latest_dates.get(name), "shards": shards}
+            self._save_shard_manifest(shard_manifest)
+        
+        output_files.update(produced)
+        if self.precompress:
+            self._precompress_outputs([name for name, _, _, _ in registry], output_files, shard_manifest)
+        return {name: output_files[name] for name, _, _, _ in registry if name in output_files}
+    
+    def _finish_failed_run(self, registry: List[Tuple], shard_manifest: Dict[str, Any]) -> None:
+        """
+        在有输出未通过校验时，为本次运行中已写出的输出更新分片清单和预压缩文件
+        
+        构建清单不更新，这些输出在下一次运行时重新生成。
+        
+        Args:
+            registry: 输出注册表
+            shard_manifest: 分片清单
+        """
+        if self._shards:
+            for name, shards in self._shards.items():
+                shard_manifest["datasets"][name] = {"format": self.output_format,
+                                                    "latest_date": self._latest_dates.get(name), "shards": shards}
+            self._save_shard_manifest(shard_manifest)
+        if self.precompress:
+            # 未通过校验的输出没有被覆盖，其兄弟文件仍是最新的，不会重新压缩
+            self._precompress_outputs([name for name, _, _, _ in registry],
+                                      {name: os.path.join(self.output_dir, filename)
+                                       for name, _, _, filename in registry}, shard_manifest)
+    
+    def _plan_incremental(self, outputs: List[Tuple], manifest: Dict[str, Dict],
+                          fingerprints: Dict[str, Dict[str, Optional[str]]], revision_months: int) -> Dict[str, str]:
+        """
+        为增量模式确定每个输出的截止日期和每个输入文件的读取起点
+        
+        同一输入文件的所有输出共用一次读取，读取起点取各输出截止日期中最早的一个；
+        只要有一个输出需要完整重新生成，该输入文件就读取全部行，其所有输出都完整重新生成。
+        
+        Args:
+            outputs: 需要生成的输出
+            manifest: 上一次运行的构建清单
+            fingerprints: 本次运行的构建指纹
+            revision_months: 重新生成的最近月份数
+            
+        Returns:
+            {输出名称: 截止日期}，读取起点写入self._date_floors
+        """
+        if self.output_format != "records":
+            logger.warning("增量模式只支持records输出格式，将完整重新生成所有输出")
+            return {}
+        
+        cutoffs = {}
+        for name, _, _, filename in outputs:
+            cutoff = self._incremental_cutoff(manifest.get(name), fingerprints[name],
+                                              os.path.join(self.output_dir, filename), revision_months)
+            if cutoff:
+                cutoffs[name] = cutoff
+        
+        for source in dict.fromkeys(source for _, source, _, _ in outputs):
+            names = [name for name, other_source, _, _ in outputs if other_source == source]
+            if all(name in cutoffs for name in names):
+                self._date_floors[source] = min(cutoffs[name] for name in names)
+                logger.info(f"增量模式: {source} 只读取 {self._date_floors[source]} 之后的数据")
+            else:
+                for name in names:
+                    cutoffs.pop(name, None)
+                logger.info(f"增量模式: {source} 的部分输出无法增量更新，将完整重新生成")
+        return cutoffs
+    
+    def _run_sequential(self, outputs: List[Tuple], shared_scan: bool,
+                        cutoffs: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        在当前进程中依次处理各输出
         
-        # 处理省份数据
-        province_data = self.process_province_data(province_file)
-        if province_data:
-            output_files["province"] = self.save_to_json(province_data, "province.json")
-        
-        # 处理艾伯塔省数据
-        alberta_data = self.process_alberta_data(province_file)
-        if alberta_data:
-            output_files["alberta"] = self.save_to_json(alberta_data, "alberta.json")
-        
-        # 处理城市数据
-        city_data = self.process_city_data(province_file)
-        if city_data:
-            output_files["city"] = self.save_to_json(city_data, "city.json")
-        
-        # 处理行业数据
-        industry_data = self.process_industry_data(industry_file)
-        if industry_data:
-            output_files["industry"] = self.save_to_json(industry_data, "industry.json")
-        
-        # 处理职业数据
-        occupation_data = self.process_occupation_data(occupation_file)
-        if occupation_data:
-            output_files["occupation"] = self.save_to_json(occupation_data, "occupation.json")
-        
-        # 处理教育程度数据
-        education_data = self.process_education_data(province_file)
-        if education_data:
-            output_files["education"] = self.save_to_json(education_data, "education.json")
-        
-        # 处理年龄组数据
-        age_data = self.process_age_data(province_file)
-        if age_data:
-            output_files["age"] = self.save_to_json(age_data, "age.json")
-        
-        # 处理性别数据
-        sex_data = self.process_sex_data(province_file)
-        if sex_data:
-            output_files["sex"] = self.save_to_json(sex_data, "sex.json")
-        
-        # 处理区域数据
-        region_data = self.process_region_data(province_file)
-        if region_data:
-            output_files["region"] = self.save_to_json(region_data, "region.json")
+        Args:
+            outputs: 输出注册表
+            shared_scan: 是否启用共享扫描模式
+            cutoffs: 增量模式下各输出的截止日期，这些输出与已有输出合并后写出
+            
+        Returns:
+            JSON文件路径字典
+        """
+        # 记录每个输入文件的使用次数和最后一个使用者，以及每个父输出的最后一个派生输出，以便尽早释放共享数据；
+        # 父输出也在本次运行中的派生输出由父输出的结果生成，不使用输入表
+        names = {name for name, _, _, _ in outputs}
+        consumers: Dict[str, int] = {}
+        last_consumer: Dict[str, int] = {}
+        last_derived: Dict[str, int] = {}
+        for index, (name, source, _, _) in enumerate(outputs):
+            parent = self.OUTPUT_SPECS[name].get("derived_from")
+            if parent in names:
+                last_derived[parent] = index
+                continue
+            consumers[source] = consumers.get(source, 0) + 1
+            last_consumer[source] = index
         
+        output_files = {}
+        try:
+            for index, (name, source, processor, filename) in enumerate(outputs):
+                reads_source = self.OUTPUT_SPECS[name].get("derived_from") not in last_derived
+                if reads_source and shared_scan and consumers[source] > 1 and source not in self._source_cache:
+                    # 合并各输出的过滤条件，流式读取时只保留至少一个输出需要的行
+                    df = self.load_csv(source, row_filter=self._pass_filter(outputs, source),
+                                       usecols=self._shared_usecols(outputs, source),
+                                       min_date=self._date_floors.get(source))
+                    if df is not None:
+                        self._source_cache[source] = self.clean_column_names(df)
+                        logger.info(f"共享扫描: {source} 只解析一次，供 {consumers[source]} 个输出使用")
+                
+                started = time.perf_counter()
+                with self._stage("output", output=name):
+                    data = processor(source)
+                    if data is not None and cutoffs and name in cutoffs:
+                        data = self._run_stage("merge_incremental", self._merge_incremental, data,
+                                               os.path.join(self.output_dir, filename), cutoffs[name])
+                    if data is not None and len(data) > 0:
+                        self._latest_dates[name] = self._latest_date(data)
+                        output_files[name], shards = self.publish_output(data, name, filename)
+                        if shards is not None:
+                            self._shards[name] = shards
+                    if data is not None and name in last_derived:
+                        self._parent_results[name] = data
+                self.last_run_timings[name] = time.perf_counter() - started
+                
+                if reads_source and last_consumer[source] == index:
+                    self._source_cache.pop(source, None)
+                    self._pass_masks.pop(source, None)
+                for parent in [parent for parent, last in last_derived.items() if last == index]:
+                    self._parent_results.pop(parent, None)
+        finally:
+            self._source_cache.clear()
+            self._pass_masks.clear()
+            self._parent_results.clear()
+        
+        self._log_timings()
         return output_files
+    
+    def _run_parallel(self, outputs: List[Tuple], workers: int) -> Dict[str, str]:
+        """
+        在进程池中并行处理各输出
+        
+        主进程把每个输入文件解析一次，复用解析缓存或写成临时的未压缩Feather文件；工作进程以内存映射方式读取，
+        而不是通过pickle传递DataFrame。未安装pyarrow时由工作进程各自解析CSV。
+        父输出也在本次运行中的派生输出与父输出在同一个任务中处理，由父输出的结果生成。
+        
+        Args:
+            outputs: 输出注册表
+            workers: 工作进程数
+            
+        Returns:
+            JSON文件路径字典
+        """
+        if feather is None:
+            logger.warning("未安装pyarrow，并行模式下各工作进程将分别解析CSV文件")
+        
+        with tempfile.TemporaryDirectory(prefix="etl_scan_") as scan_dir:
+            parsed: Dict[str, Optional[str]] = {}
+            for _, source, _, _ in outputs:
+                if source in parsed or feather is None:
+                    continue
+                usecols = self._shared_usecols(outputs, source)
+                row_filter = self._pass_filter(outputs, source)
+                df = self.load_csv(source, row_filter=row_filter, usecols=usecols)
+                if df is None:
+                    parsed[source] = None
+                    continue
+                # 已解析表缓存中的文件可直接交给工作进程
+                full_path = os.path.join(self.input_dir, source) if not os.path.isabs(source) else source
+                cache_path = self._parsed_cache_path(full_path, row_filter=row_filter, usecols=usecols)
+                if cache_path and os.path.exists(cache_path):
+                    parsed[source] = cache_path
+                    continue
+                path = os.path.join(scan_dir, f"{len(parsed)}.feather")
+                feather.write_feather(self.clean_column_names(df).reset_index(drop=True), path,
+                                      compression="uncompressed")
+                parsed[source] = path
+                logger.info(f"并行模式: {source} 已解析并缓存到 {path}")
+            
+            names = {name for name, _, _, _ in outputs}
+            derived: Dict[str, List[Tuple[str, str]]] = {}
+            for name, _, _, filename in outputs:
+                parent = self.OUTPUT_SPECS[name].get("derived_from")
+                if parent in names:
+                    derived.setdefault(parent, []).append((name, filename))
+            
+            results = {}
+            failure = None
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = []
+                for name, source, processor, filename in outputs:
+                    if source in parsed and parsed[source] is None:
+                        continue  # 输入文件加载失败
+                    if self.OUTPUT_SPECS[name].get("derived_from") in names:
+                        continue  # 与父输出在同一个任务中处理
+                    futures.append(pool.submit(_run_output_task, self._settings(), source, parsed.get(source),
+                                               name, filename, derived.get(name, [])))
+                for future in as_completed(futures):
+                    # 有输出未通过校验时继续收集其他任务的结果，以便记录已写出的输出
+                    try:
+                        task_results, events = future.result()
+                    except DataValidationError as e:
+                        failure = failure or e
+                        continue
+                    if self.profiler is not None and events:
+                        self.profiler.events.extend(events)
+                    for name, output_path, seconds, latest_date, shards in task_results:
+                        self.last_run_timings[name] = seconds
+                        if output_path:
+                            results[name] = output_path
+                            self._latest_dates[name] = latest_date
+                            if shards is not None:
+                                self._shards[name] = shards
+        
+        self._log_timings()
+        if failure is not None:
+            raise failure
+        # 按注册表顺序返回
+        return {name: results[name] for name, _, _, _ in outputs if name in results}
+
+
+def _run_output_task(settings: Dict[str, Any], source: str, parsed_path: Optional[str], name: str, filename: str,
+                     derived: Optional[List[Tuple[str, str]]] = None
+                     ) -> Tuple[List[Tuple[str, Optional[str], float, Optional[str], Optional[List[Dict]]]],
+                                Optional[List[Dict]]]:
+    """
+    并行模式的工作进程入口: 处理单个输出及其派生输出并保存为JSON文件
+    
+    Args:
+        settings: ETL处理器构造参数
+        source: 输入文件
+        parsed_path: 主进程写出的已解析Feather文件，为None时自行解析CSV
+        name: 输出名称
+        filename: 输出文件名
+        derived: 由该输出的结果生成的派生输出 [(输出名称, 输出文件名)]
+        
+    Returns:
+        ([(输出名称, JSON文件路径或None, 处理耗时秒数, 输出中的最新日期, 分片描述列表（未启用分片或未写出时为None）)],
+         阶段记录列表（未启用记录时为None）)
+    """
+    etl = UnemploymentDataETL(**settings)
+    results = []
+    for output, output_filename in [(name, filename)] + list(derived or []):
+        started = time.perf_counter()
+        output_path = None
+        latest_date = None
+        shards = None
+        with etl._stage("output", output=output):
+            if parsed_path and source not in etl._source_cache:
+                with etl._stage("read_parsed_feather"):
+                    etl._source_cache[source] = feather.read_table(parsed_path, memory_map=True).to_pandas()
+            data = etl.process_output(output, source)
+            if data is not None and len(data) > 0:
+                latest_date = etl._latest_date(data)
+                output_path, shards = etl.publish_output(data, output, output_filename)
+            if data is not None and output == name and derived:
+                etl._parent_results[name] = data
+        results.append((output, output_path, time.perf_counter() - started, latest_date, shards))
+    events = etl.profiler.events if etl.profiler is not None else None
+    return results, events
 
 
 def main():
     # 创建ETL处理器，使用相对路径
     etl = UnemploymentDataETL(
         input_dir="../canada_unemployment_data", 
-        output_dir="../public/data"
+        output_dir="../public/data",
+        precompress=True
     )
     
     # 运行ETL管道
-    output_files = etl.run_etl_pipeline(
-        province_file="14100287.csv",  # 省份数据
-        industry_file="14100023.csv",  # 行业数据
-        occupation_file="14100310.csv" # 职业数据
-    )
+    try:
+        output_files = etl.run_etl_pipeline(
+            province_file="14100287.csv",  # 省份数据
+            industry_file="14100023.csv",  # 行业数据
+            occupation_file="14100310.csv" # 职业数据
+        )
+    except DataValidationError as e:
+        # 校验失败时停止发布，未通过校验的输出保持上一次的版本
+        logger.error(str(e))
+        raise SystemExit(1)
     
     # 打印输出文件路径
     logger.info(f"ETL处理完成，共生成 {len(output_files)} 个JSON文件")
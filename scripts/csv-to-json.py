@@ -4,6 +4,8 @@ import os
 import json
 from datetime import datetime
 
+from statcan_common import extract_classification_code, normalize_ref_dates, strip_classification_code
+
 # 配置文件路径
 DATA_DIR = "/Users/niuyp/Downloads/1410002201"
 OUTPUT_DIR = "/Users/niuyp/Documents/github.com/canada-unemployment-dashboard/scripts/"
@@ -81,6 +83,23 @@ def process_csv_to_json(dfs):
     
     print(f"筛选出 {filtered_df.shape[0]} 条失业率数据")
     
+    # 每个不同的日期只解析一次；无法解析日期的记录跳过
+    filtered_df['Date'] = normalize_ref_dates(filtered_df[ref_date_col])
+    unparsed = filtered_df['Date'].isna()
+    if unparsed.any():
+        print(f"跳过 {unparsed.sum()} 条日期无法解析的记录: {filtered_df.loc[unparsed, ref_date_col].unique().tolist()}")
+        filtered_df = filtered_df[~unparsed]
+    
+    # 行业名称缺失的记录无法提取NAICS代码，跳过
+    missing_industry = filtered_df[industry_col].isna()
+    if missing_industry.any():
+        print(f"跳过 {missing_industry.sum()} 条行业名称缺失的记录")
+        filtered_df = filtered_df[~missing_industry]
+    
+    # 从行业名称中提取NAICS代码 [xx-xx] 或 [xx]，并移除名称中的代码部分；每个不同的行业名称只处理一次
+    filtered_df['NAICS'] = extract_classification_code(filtered_df[industry_col])
+    filtered_df['NAICS Description'] = strip_classification_code(filtered_df[industry_col])
+    
     # 处理数据为期望的格式
     result = []
     for _, row in filtered_df.iterrows():
@@ -94,31 +113,17 @@ def process_csv_to_json(dfs):
                 
             # 创建记录
             record = {
-                "Date": pd.to_datetime(row[ref_date_col]).strftime('%Y-%m-%dT00:00:00'),
+                "Date": row['Date'],
                 "GeoID": row[dguid_col],
                 "GeoName": row[geo_col],
-                "NAICS Description": row[industry_col],
+                "NAICS Description": row['NAICS Description'],
                 "Characteristic": "Unemployment rate",
                 "Sex": "Both sexes", # 假设这个字段
                 "Age": "15 years and over", # 假设这个字段
-                "Value": value
+                "Value": value,
+                "NAICS": row['NAICS']
             }
             
-            # 尝试添加NAICS代码
-            industry_name = row[industry_col]
-            naics_code = ""
-            if industry_name:
-                # 尝试从行业名称中提取NAICS代码 [xx-xx] 或 [xx]
-                import re
-                code_match = re.search(r'\[([^\]]+)\]', industry_name)
-                if code_match:
-                    naics_code = code_match.group(1)
-                    # 移除行业名称中的代码部分
-                    clean_name = re.sub(r'\s*\[[^\]]+\]', '', industry_name).strip()
-                    record["NAICS Description"] = clean_name
-            
-            record["NAICS"] = naics_code
-            
             result.append(record)
         except Exception as e:
             print(f"处理行时出错: {e}")
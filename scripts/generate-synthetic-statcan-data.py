@@ -0,0 +1,317 @@
+"""
+生成与加拿大统计局整表CSV（14100287、14100023、14100310）列布局完全相同的合成数据
+
+真实CSV不在仓库中，这里按StatCan整表的组织方式生成可复现的数据: 各维度取值的笛卡尔积构成序列，
+按REF_DATE升序、维度依次展开排列，最新的时期排在文件末尾。行数可在10万到5000万之间任意指定，
+时期数超过上限时追加合成的地理区域，使日期始终落在合理范围内。
+
+GEO维度除省份外还包含ETL处理器使用的城市和艾伯塔省经济区域，使每个输出都有数据。
+"""
+import argparse
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('synthetic_statcan')
+
+# 维度列之后的公共列，与StatCan整表CSV一致
+TRAILING_COLUMNS = ["UOM", "UOM_ID", "SCALAR_FACTOR", "SCALAR_ID", "VECTOR", "COORDINATE",
+                    "VALUE", "STATUS", "SYMBOL", "TERMINATED", "DECIMALS"]
+
+PROVINCES = [
+    "Canada", "Newfoundland and Labrador", "Prince Edward Island", "Nova Scotia", "New Brunswick", "Quebec",
+    "Ontario", "Manitoba", "Saskatchewan", "Alberta", "British Columbia"
+]
+
+# ETL的city和region输出从省份表中读取的地理区域
+CITIES_AND_REGIONS = [
+    "Calgary", "Edmonton", "Vancouver", "Toronto", "Montreal", "Ottawa",
+    "Lethbridge-Medicine Hat", "Camrose-Drumheller", "Red Deer", "Northeast"
+]
+
+DGUIDS = {
+    "Canada": "2021A000011124",
+    "Newfoundland and Labrador": "2021A000210",
+    "Prince Edward Island": "2021A000211",
+    "Nova Scotia": "2021A000212",
+    "New Brunswick": "2021A000213",
+    "Quebec": "2021A000224",
+    "Ontario": "2021A000235",
+    "Manitoba": "2021A000246",
+    "Saskatchewan": "2021A000247",
+    "Alberta": "2021A000248",
+    "British Columbia": "2021A000259"
+}
+
+LABOUR_FORCE_CHARACTERISTICS = [
+    "Population", "Labour force", "Employment", "Full-time employment", "Part-time employment",
+    "Unemployment", "Not in labour force", "Unemployment rate", "Participation rate", "Employment rate"
+]
+
+GENDERS = ["Total - Gender", "Men+", "Women+"]
+
+# 各表的列布局: 维度列（按CSV中的顺序）及其取值、频率
+TABLE_LAYOUTS: Dict[str, Dict] = {
+    "14100287": {
+        "frequency": "M",
+        "dimensions": {
+            "GEO": PROVINCES + CITIES_AND_REGIONS,
+            "Labour force characteristics": LABOUR_FORCE_CHARACTERISTICS,
+            "Gender": GENDERS,
+            "Age group": [
+                "15 years and over", "15 to 64 years", "15 to 24 years", "15 to 19 years", "20 to 24 years",
+                "25 years and over", "25 to 54 years", "55 years and over", "55 to 64 years"
+            ],
+            "Statistics": ["Estimate", "Standard error of estimate"],
+            "Data type": ["Seasonally adjusted", "Unadjusted"]
+        }
+    },
+    "14100023": {
+        "frequency": "Y",
+        "dimensions": {
+            "GEO": PROVINCES,
+            "Labour force characteristics": LABOUR_FORCE_CHARACTERISTICS,
+            "North American Industry Classification System (NAICS)": [
+                "Total, all industries",
+                "Goods-producing sector",
+                "Agriculture [111-112, 1100, 1151-1152]",
+                "Forestry, fishing, mining, quarrying, oil and gas [21, 113-114, 1153, 2100]",
+                "Utilities [22]",
+                "Construction [23]",
+                "Manufacturing [31-33]",
+                "Services-producing sector",
+                "Wholesale and retail trade [41, 44-45]",
+                "Transportation and warehousing [48-49]",
+                "Finance, insurance, real estate, rental and leasing [52-53]",
+                "Professional, scientific and technical services [54]",
+                "Business, building and other support services [55-56]",
+                "Educational services [61]",
+                "Health care and social assistance [62]",
+                "Information, culture and recreation [51, 71]",
+                "Accommodation and food services [72]",
+                "Other services (except public administration) [81]",
+                "Public administration [91]",
+                "Unclassified industries"
+            ],
+            "Gender": GENDERS,
+            "Age group": ["15 years and over", "15 to 24 years", "25 to 54 years", "55 years and over",
+                          "15 to 64 years"]
+        }
+    },
+    "14100310": {
+        "frequency": "M",
+        "dimensions": {
+            "GEO": PROVINCES,
+            "Labour force characteristics": ["Labour force", "Employment", "Unemployment", "Unemployment rate"],
+            "National Occupational Classification (NOC)": [
+                "Total, all occupations [00-95]",
+                "Management occupations [0]",
+                "Business, finance and administration occupations, except management [1]",
+                "Natural and applied sciences and related occupations, except management [2]",
+                "Health occupations, except management [3]",
+                "Occupations in education, law and social, community and government services, except management [4]",
+                "Occupations in art, culture, recreation and sport, except management [5]",
+                "Sales and service occupations, except management [6]",
+                "Trades, transport and equipment operators and related occupations, except management [7]",
+                "Natural resources, agriculture and related production occupations, except management [8]",
+                "Occupations in manufacturing and utilities, except management [9]",
+                "Unemployed persons who have never worked before or who last worked more than 1 year ago"
+            ],
+            "Gender": GENDERS,
+            "Statistics": ["Estimate", "Standard error of estimate"],
+            "Data type": ["Seasonally adjusted", "Unadjusted"]
+        }
+    }
+}
+
+# 时期数上限（约50年），超过时通过追加合成地理区域增加序列数
+MAX_PERIODS = {"M": 600, "Y": 50}
+
+# 最新的月度时期，年度表截止到上一年
+LATEST_PERIOD = pd.Period("2025-06", freq="M")
+
+
+def table_columns(table_id: str) -> List[str]:
+    """
+    返回表的完整列布局
+
+    Args:
+        table_id: 表编号
+
+    Returns:
+        列名列表
+    """
+    return ["REF_DATE", "GEO", "DGUID"] + [col for col in TABLE_LAYOUTS[table_id]["dimensions"] if col != "GEO"] \
+        + TRAILING_COLUMNS
+
+
+def _series_frame(table_id: str, rows: int) -> Tuple[pd.DataFrame, pd.Index]:
+    """
+    构造序列表（各维度取值的笛卡尔积，每个序列一行）和时期轴
+
+    Args:
+        table_id: 表编号
+        rows: 目标行数
+
+    Returns:
+        (序列DataFrame, 按升序排列的REF_DATE字符串)
+    """
+    layout = TABLE_LAYOUTS[table_id]
+    dimensions = dict(layout["dimensions"])
+    series_per_geo = math.prod(len(values) for col, values in dimensions.items() if col != "GEO")
+
+    # 先增加时期数，达到上限后再追加合成地理区域
+    periods = min(math.ceil(rows / (series_per_geo * len(dimensions["GEO"]))), MAX_PERIODS[layout["frequency"]])
+    geo_count = max(math.ceil(rows / (series_per_geo * periods)), len(dimensions["GEO"]))
+    geos = dimensions["GEO"] + [f"Synthetic region {i}" for i in range(len(dimensions["GEO"]) + 1, geo_count + 1)]
+    dimensions["GEO"] = geos
+
+    index = pd.MultiIndex.from_product([range(len(values)) for values in dimensions.values()])
+    codes = [np.asarray(level_codes, dtype=np.int64) for level_codes in index.codes]
+    series = pd.DataFrame({col: np.asarray(values, dtype=object)[codes[i]]
+                           for i, (col, values) in enumerate(dimensions.items())})
+    dguids = np.array([DGUIDS.get(geo, f"2021S0503{i:04d}") for i, geo in enumerate(geos)], dtype=object)
+    series.insert(1, "DGUID", dguids[codes[0]])
+
+    is_rate = series["Labour force characteristics"].str.endswith("rate").to_numpy()
+    series["UOM"] = np.where(is_rate, "Percentage", "Persons")
+    series["UOM_ID"] = np.where(is_rate, 239, 249)
+    series["SCALAR_FACTOR"] = np.where(is_rate, "units", "thousands")
+    series["SCALAR_ID"] = np.where(is_rate, 0, 3)
+    series["VECTOR"] = "v" + pd.Series(np.arange(len(series)) + 2062811).astype(str)
+    coordinate = pd.Series(codes[0] + 1).astype(str)
+    for level_codes in codes[1:]:
+        coordinate = coordinate + "." + pd.Series(level_codes + 1).astype(str)
+    series["COORDINATE"] = coordinate
+    series["STATUS"] = ""
+    series["SYMBOL"] = ""
+    series["TERMINATED"] = ""
+    series["DECIMALS"] = 1
+
+    if layout["frequency"] == "Y":
+        axis = pd.period_range(end=pd.Period(LATEST_PERIOD.year - 1, freq="Y"), periods=periods, freq="Y")
+        labels = axis.strftime("%Y")
+    else:
+        labels = pd.period_range(end=LATEST_PERIOD, periods=periods, freq="M").strftime("%Y-%m")
+    return series, pd.Index(labels)
+
+
+def _render_csv(frame: pd.DataFrame) -> np.ndarray:
+    """将DataFrame的每一行渲染为CSV文本（不含换行符）"""
+    text = frame.to_csv(header=False, index=False, lineterminator="\n")
+    return np.array(text.split("\n")[:-1], dtype=object)
+
+
+def _format_tenths(values: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """将数值格式化为一位小数的文本，缺失值为空字符串"""
+    tenths = np.rint(values * 10).astype(np.int64)
+    text = (pd.Series(tenths // 10).astype(str).to_numpy(dtype=object) + "."
+            + pd.Series(tenths % 10).astype(str).to_numpy(dtype=object))
+    text[missing] = ""
+    return text
+
+
+def generate_table(table_id: str, rows: int, output_path: str, seed: int = 0, chunk_rows: int = 1000000) -> int:
+    """
+    生成一张合成表并分块写出为CSV，内存占用与总行数无关
+
+    总行数超过目标时从最早的时期开始截掉多余的行，保证最近的时期完整。
+
+    Args:
+        table_id: 表编号（14100287、14100023或14100310）
+        rows: 目标行数
+        output_path: 输出CSV路径
+        seed: 随机数种子，相同参数生成的文件逐字节相同
+        chunk_rows: 每次写出的大致行数
+
+    Returns:
+        写出的行数
+    """
+    if table_id not in TABLE_LAYOUTS:
+        raise ValueError(f"不支持的表: {table_id}")
+    series, axis = _series_frame(table_id, rows)
+    n_series = len(series)
+    skip = n_series * len(axis) - rows
+    columns = table_columns(table_id)
+    rng = np.random.default_rng(seed)
+    is_rate = (series["UOM"] == "Percentage").to_numpy()
+    periods_per_chunk = max(1, chunk_rows // n_series)
+
+    # 每个序列在VALUE前后的固定文本只渲染一次（按CSV规则加引号），逐行只拼接日期和数值
+    value_at = columns.index("VALUE")
+    prefix = _render_csv(series[columns[1:value_at]])
+    suffix = _render_csv(series[columns[value_at + 1:]])
+    missing_suffix = np.full(n_series, "..", dtype=object) + suffix  # STATUS列为空，缺失值标记为".."
+
+    written = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(",".join(columns) + "\n")
+        for start in range(0, len(axis), periods_per_chunk):
+            block = axis[start:start + periods_per_chunk]
+            n = n_series * len(block)
+
+            # 比率在2%到15%之间，人数以千人计；约1%的值缺失并标记为".."
+            rates = np.tile(is_rate, len(block))
+            values = np.where(rates, rng.uniform(2, 15, n), rng.uniform(1, 20000, n))
+            missing = rng.random(n) < 0.01
+
+            if skip >= n:
+                skip -= n
+                continue
+            rows_text = (np.repeat(block.to_numpy(dtype=object), n_series) + ","
+                         + np.tile(prefix, len(block)) + "," + _format_tenths(values, missing) + ","
+                         + np.where(missing, np.tile(missing_suffix, len(block)), np.tile(suffix, len(block))))
+            rows_text = rows_text[skip:]
+            skip = 0
+            f.write("\n".join(rows_text.tolist()) + "\n")
+            written += len(rows_text)
+    logger.info(f"已生成 {output_path}，共 {written} 行")
+    return written
+
+
+def generate_dataset(rows: int, output_dir: str, tables: Optional[List[str]] = None, seed: int = 0) -> Dict[str, str]:
+    """
+    在目录中生成多张合成表，文件名与ETL默认输入相同（<表编号>.csv）
+
+    Args:
+        rows: 每张表的行数
+        output_dir: 输出目录
+        tables: 表编号列表，为None时生成全部三张表
+        seed: 随机数种子
+
+    Returns:
+        {表编号: CSV路径}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for table_id in tables or list(TABLE_LAYOUTS):
+        paths[table_id] = os.path.join(output_dir, f"{table_id}.csv")
+        generate_table(table_id, rows, paths[table_id], seed=seed)
+    return paths
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="生成与StatCan整表CSV列布局相同的合成数据")
+    parser.add_argument("--rows", type=lambda text: int(float(text)), default=100000,
+                        help="每张表的行数，如 100000 或 5e7")
+    parser.add_argument("--output_dir", default="../.etl_bench/data", help="输出目录（相对于脚本目录）")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLE_LAYOUTS), help="要生成的表，默认全部")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    generate_dataset(args.rows, os.path.join(script_dir, args.output_dir), args.tables, args.seed)
+
+
+if __name__ == "__main__":
+    main()
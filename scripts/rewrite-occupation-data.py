@@ -4,6 +4,8 @@ import os
 from datetime import datetime
 import numpy as np
 
+from statcan_common import normalize_ref_dates
+
 # Path to input CSV file
 input_file = '/Users/niuyp/Downloads/1410042101_databaseLoadingData2.csv'
 
@@ -17,14 +19,17 @@ os.makedirs(output_dir, exist_ok=True)
 # Read the CSV file
 df = pd.read_csv(input_file)
 
+# Convert date format once per distinct REF_DATE (assuming 'MMM-YY' format)
+df['Date'] = normalize_ref_dates(df['REF_DATE'], date_format='%b-%y')
+
 # Format the data into the required JSON structure
 formatted_data = []
 
 for _, row in df.iterrows():
     try:
-        # Convert date format (assuming REF_DATE is in 'MMM-YY' format)
-        date_obj = pd.to_datetime(row['REF_DATE'], format='%b-%y')
-        formatted_date = date_obj.strftime('%Y-%m-%d') + 'T00:00:00'
+        formatted_date = row['Date']
+        if pd.isna(formatted_date):
+            raise ValueError(f"Unparseable REF_DATE: {row['REF_DATE']}")
 
         # Default values for fields that might be missing
         geo_id = 48  # Default to Alberta's code
@@ -6,6 +6,8 @@ import io
 import logging
 from typing import List, Dict, Optional, Tuple
 
+from statcan_common import filter_positions
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -189,6 +191,8 @@ class StatCanDownloader:
         """
         处理数据，包括过滤和选择列
         
+        所有过滤条件合并为一组行位置，与列选择一起只取一次数据，不为每个条件复制剩余数据。
+        
         Args:
             file_path: CSV文件路径
             filters: 过滤条件，格式为 {列名: 值}
@@ -201,26 +205,27 @@ class StatCanDownloader:
             df = pd.read_csv(file_path, encoding='utf-8', low_memory=False)
             logger.info(f"原始数据形状: {df.shape}")
             
-            # 应用过滤器
+            # 计算过滤后的行位置
+            rows = None
             if filters:
-                for col, val in filters.items():
-                    if col in df.columns:
-                        if isinstance(val, list):
-                            df = df[df[col].isin(val)]
-                        else:
-                            df = df[df[col] == val]
-                
-                logger.info(f"过滤后数据形状: {df.shape}")
+                rows = filter_positions(df, filters)
+                logger.info(f"过滤后数据形状: {(len(df) if rows is None else len(rows), df.shape[1])}")
             
             # 选择特定列
+            columns = None
             if selected_columns:
                 available_columns = [col for col in selected_columns if col in df.columns]
                 if available_columns:
-                    df = df[available_columns]
-                    logger.info(f"选择列后数据形状: {df.shape}")
+                    columns = df.columns.get_indexer(available_columns)
                 else:
                     logger.warning("未找到任何指定的列")
             
+            # 按行位置和列位置只取一次数据
+            if rows is not None or columns is not None:
+                df = df.iloc[slice(None) if rows is None else rows, slice(None) if columns is None else columns]
+                if columns is not None:
+                    logger.info(f"选择列后数据形状: {df.shape}")
+            
             return df
         
         except Exception as e:
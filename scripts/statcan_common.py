@@ -0,0 +1,469 @@
+"""
+加拿大统计局（Statistics Canada）CSV转换脚本共用的工具函数
+
+StatCan的维度列（REF_DATE、GEO、分类描述等）在数百万行中只有几十到几百个不同的值，
+这里的函数都按"每个不同值只计算一次，再按编码广播回所有行"的方式实现。
+"""
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，缺失时只生成.gz文件
+    brotli = None
+
+# 输出JSON中统一使用的日期格式
+ISO_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# StatCan REF_DATE常见格式：月度表为"YYYY-MM"，部分表为"YYYY-MM-DD"，年度表为"YYYY"
+STATCAN_DATE_FORMATS = ('%Y-%m', '%Y-%m-%d', '%Y')
+
+# 分类描述末尾方括号中的分类代码，如"Construction [23]"、"Total, all occupations [00-95]"
+CLASSIFICATION_CODE_PATTERN = r'\[([^\]]+)\]'
+# 描述中的方括号代码部分（连同前导空白），用于得到不带代码的名称
+CLASSIFICATION_SUFFIX_PATTERN = r'\s*\[[^\]]+\]'
+# 没有方括号时，描述开头的数字代码，如"21-22 Natural resources"
+LEADING_CODE_PATTERN = r'^(\d+(?:-\d+)?)'
+
+
+def factorize_values(values: pd.Series):
+    """
+    将列拆分为(编码, 不同值)，分类列直接复用已有的类别编码
+
+    Args:
+        values: 输入列
+
+    Returns:
+        (编码数组, 不同值Index)，缺失值的编码为-1
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Index(uniques)
+
+
+def broadcast_by_codes(codes: np.ndarray, lookup: Sequence, index: pd.Index, missing=np.nan) -> pd.Series:
+    """
+    按编码把每个不同值的计算结果广播回所有行
+
+    Args:
+        codes: factorize_values返回的编码数组
+        lookup: 与不同值一一对应的结果
+        index: 结果Series的索引
+        missing: 编码为-1（缺失值）的行对应的结果
+
+    Returns:
+        广播后的Series
+    """
+    # 查找表末尾追加缺失值，编码-1恰好取到它
+    table = np.array(list(lookup) + [missing], dtype=object)
+    return pd.Series(table.take(codes), index=index)
+
+
+def column_mask(series: pd.Series, values) -> np.ndarray:
+    """
+    计算单列过滤条件的布尔掩码，分类列按类别编码查表
+
+    Args:
+        series: 输入列
+        values: 值或值列表
+
+    Returns:
+        布尔数组
+    """
+    wanted = values if isinstance(values, list) else [values]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        wanted_codes = series.cat.categories.get_indexer(wanted)
+        # 查找表末尾追加False，缺失值的编码-1恰好取到它
+        lookup = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+        lookup[wanted_codes[wanted_codes >= 0]] = True
+        return lookup.take(series.cat.codes.to_numpy())
+    if isinstance(values, list):
+        return series.isin(values).to_numpy()
+    return (series == values).to_numpy()
+
+
+def filter_positions(df: pd.DataFrame, filters: Dict[str, Any],
+                     masks: Optional[Dict[Tuple, Tuple[np.ndarray, int]]] = None,
+                     log: Optional[Callable[[str, list, int], None]] = None) -> Optional[np.ndarray]:
+    """
+    一次求出满足全部过滤条件的行位置，调用方只需按位置取一次行，而不是每个条件复制一次剩余数据
+
+    每个(列, 值)条件只计算一次掩码（可通过masks在多次调用间共用）；按命中行数从少到多应用，
+    选择性最高的条件先展开为行位置，其余条件只在剩余行上取值。不存在的列被忽略。
+
+    Args:
+        df: 输入DataFrame
+        filters: 过滤条件，格式为 {列名: 值或值列表}
+        masks: 掩码缓存，格式为 {(列名, 值): (掩码, 命中行数)}
+        log: 每应用一个条件后调用一次，参数为(列名, 值列表, 剩余行数)
+
+    Returns:
+        升序排列的行位置数组，没有可应用的条件时返回None
+    """
+    masks = {} if masks is None else masks
+    keys = []
+    for col, values in filters.items():
+        if col not in df.columns:
+            continue
+        key = (col, tuple(values) if isinstance(values, list) else (values,))
+        if key not in masks:
+            mask = column_mask(df[col], values)
+            masks[key] = (mask, int(mask.sum()))
+        keys.append(key)
+
+    rows = None
+    for key in sorted(keys, key=lambda k: masks[k][1]):
+        mask = masks[key][0]
+        rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        if log is not None:
+            log(key[0], list(key[1]), len(rows))
+    return rows
+
+
+def _distinct_strings(values: pd.Series):
+    """
+    返回(编码, 不同值Series, 字符串掩码)，供按不同值执行的字符串处理使用
+
+    Args:
+        values: 输入列
+
+    Returns:
+        (编码数组, object类型的不同值Series, 不同值是否为字符串的掩码)
+    """
+    codes, uniques = factorize_values(values)
+    distinct = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    is_str = distinct.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    return codes, distinct, is_str
+
+
+def extract_classification_code(values: pd.Series, leading_digits: bool = False, default: str = '') -> pd.Series:
+    """
+    从分类描述（NOC、NAICS等）中提取方括号内的代码，每个不同的描述只匹配一次
+
+    Args:
+        values: 分类描述列
+        leading_digits: 没有方括号时是否提取描述开头的数字代码
+        default: 无法提取代码或描述缺失时的结果
+
+    Returns:
+        代码Series
+    """
+    codes, distinct, is_str = _distinct_strings(values)
+    text = distinct.where(is_str, '')
+    extracted = text.str.extract(CLASSIFICATION_CODE_PATTERN, expand=False)
+    if leading_digits:
+        extracted = extracted.fillna(text.str.extract(LEADING_CODE_PATTERN, expand=False))
+    return broadcast_by_codes(codes, extracted.fillna(default).tolist(), values.index, missing=default)
+
+
+def strip_classification_code(values: pd.Series, pattern: str = CLASSIFICATION_SUFFIX_PATTERN) -> pd.Series:
+    """
+    移除分类描述中的方括号代码部分，每个不同的描述只处理一次；不含代码的描述和非字符串值保持不变
+
+    Args:
+        values: 分类描述列
+        pattern: 需要移除的代码部分的正则表达式
+
+    Returns:
+        不带代码的名称Series
+    """
+    codes, distinct, is_str = _distinct_strings(values)
+    text = distinct.where(is_str, '')
+    has_code = text.str.contains(pattern, regex=True) & is_str
+    cleaned = distinct.where(~has_code, text.str.replace(pattern, '', regex=True).str.strip())
+    return broadcast_by_codes(codes, cleaned.tolist(), values.index)
+
+
+def normalize_ref_dates(values: pd.Series, date_format: Optional[str] = None,
+                        output_format: str = ISO_DATE_FORMAT) -> pd.Series:
+    """
+    将REF_DATE列标准化为ISO日期字符串，每个不同的日期只解析一次
+
+    Args:
+        values: 原始日期列
+        date_format: 原始日期格式，为None时依次尝试STATCAN_DATE_FORMATS
+        output_format: 输出日期格式
+
+    Returns:
+        日期字符串Series（无法解析或缺失的值为NaN）
+    """
+    codes, uniques = factorize_values(values)
+    raw = pd.Series(uniques.astype(str), dtype=object)
+
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]')
+    for fmt in ((date_format,) if date_format else STATCAN_DATE_FORMATS):
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(raw[pending], format=fmt, errors='coerce')
+
+    # 其余无法按固定格式解析的值回退到格式推断（同样只针对不同值）
+    pending = parsed.isna()
+    if pending.any() and not date_format:
+        for i in np.flatnonzero(pending.to_numpy()):
+            parsed.iloc[i] = pd.to_datetime(raw.iloc[i], errors='coerce')
+
+    formatted = parsed.dt.strftime(output_format)
+    return broadcast_by_codes(codes, formatted.tolist(), values.index)
+
+
+def _json_scalar(value) -> str:
+    """将单个Python/numpy标量编码为JSON文本，结果与json.dump对to_dict记录的输出一致"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def encode_json_column(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将一列编码为(编码数组, JSON文本查找表)，每个不同值只调用一次json编码
+
+    缺失值的编码方式与json.dump(df.to_dict(orient="records"))相同：None写为null，
+    浮点NaN写为NaN；可空类型（如Float64）由有效性掩码直接写为null。
+
+    Args:
+        series: 输入列
+
+    Returns:
+        (编码数组, 查找表)，查找表.take(编码数组)即为每行的JSON文本
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int64)
+        table = [_json_scalar(value) for value in series.cat.categories] + ['NaN']
+        codes[codes < 0] = len(table) - 1
+        return codes, np.array(table, dtype=object)
+
+    if pd.api.types.is_bool_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return series.to_numpy().astype(np.int64), np.array(['false', 'true'], dtype=object)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    codes = codes.astype(np.int64)
+    table = [_json_scalar(value) for value in uniques]
+    missing = codes < 0
+    if missing.any():
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.StringDtype):
+            # 带有效性掩码的可空类型: 缺失即null
+            codes[missing] = len(table)
+            table.append('null')
+        else:
+            # object列中None和NaN在json.dump中的写法不同，需要区分
+            is_none = missing.copy()
+            if dtype == object:
+                is_none[missing] = np.equal(series.to_numpy()[missing], None)
+            else:
+                is_none[:] = False
+            codes[missing & ~is_none] = len(table)
+            codes[is_none] = len(table) + 1
+            table.extend(['NaN', 'null'])
+    return codes, np.array(table, dtype=object)
+
+
+def write_json_records(df: pd.DataFrame, fp: IO[str], compact: bool = False, batch_size: int = 50000) -> int:
+    """
+    按列数组分批流式写出JSON记录数组，不构造中间的字典列表
+
+    非紧凑模式的输出与json.dump(df.to_dict(orient="records"), fp, ensure_ascii=False, indent=2)
+    逐字节相同；紧凑模式不写任何空白。
+
+    Args:
+        df: 输入DataFrame
+        fp: 文本文件对象
+        compact: 是否使用紧凑格式
+        batch_size: 每批拼接的记录数
+
+    Returns:
+        写出的记录数
+    """
+    n = len(df)
+    if n == 0:
+        fp.write('[]')
+        return 0
+
+    keys = [json.dumps(str(col), ensure_ascii=False) for col in df.columns]
+    if compact:
+        open_record, key_sep, field_sep, close_record = '{', ':', ',', '}'
+        array_open, record_sep, array_close = '[', ',', ']'
+    else:
+        open_record, key_sep, field_sep, close_record = '  {\n    ', ': ', ',\n    ', '\n  }'
+        array_open, record_sep, array_close = '[\n', ',\n', '\n]'
+
+    # 每个字段前的固定文本（记录开头或分隔符 + 键名），与编码后的列值交替拼接
+    prefixes = [(open_record if i == 0 else field_sep) + key + key_sep for i, key in enumerate(keys)]
+    columns = [encode_json_column(df[col]) for col in df.columns]
+
+    fp.write(array_open)
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        rows = np.full(stop - start, '', dtype=object)
+        for prefix, (codes, table) in zip(prefixes, columns):
+            rows = rows + prefix + table.take(codes[start:stop])
+        rows = rows + close_record
+        if start > 0:
+            fp.write(record_sep)
+        fp.write(record_sep.join(rows.tolist()))
+    fp.write(array_close)
+    return n
+
+
+# 列式输出格式标识，与src/utils/dataProcessing.js中的decodeColumnarData对应
+COLUMNAR_FORMAT = 'columnar-v1'
+
+
+def _dictionary_encode(series: pd.Series, sort: bool = False) -> Tuple[np.ndarray, list]:
+    """
+    将维度列编码为(整数编码, 字典)，字典只包含实际出现的值；缺失值编码为-1
+
+    Args:
+        series: 输入列
+        sort: 是否按值排序字典（用于日期轴）
+
+    Returns:
+        (编码数组, 字典值列表)
+    """
+    codes, uniques = factorize_values(series)
+    used = np.unique(codes[codes >= 0])
+    if sort:
+        used = used[np.argsort(np.asarray(uniques.take(used), dtype=object).astype(str), kind='stable')]
+    # 旧编码 -> 新编码的查找表，末尾元素供缺失值(-1)使用
+    remap = np.full(len(uniques) + 1, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    dictionary = [value.item() if isinstance(value, np.generic) else value for value in uniques.take(used)]
+    return remap.take(codes), dictionary
+
+
+def write_json_columnar(df: pd.DataFrame, fp: IO[str], value_columns: Sequence[str] = ('Value',),
+                        date_column: str = 'Date') -> int:
+    """
+    以列式、字典编码的布局写出JSON
+
+    维度列各自存一份字典和整数编码数组，日期列的字典即排好序的日期轴，数值列为浮点数组（缺失为null）。
+    布局示例: {"format": "columnar-v1", "length": 2, "columns": ["Date", "GeoName", "Value"],
+    "dates": ["2024-01-01T00:00:00"], "dictionaries": {"GeoName": ["Alberta", "Canada"]},
+    "codes": {"Date": [0, 0], "GeoName": [0, 1]}, "values": {"Value": [7.1, null]}}
+
+    Args:
+        df: 输入DataFrame
+        fp: 文本文件对象
+        value_columns: 作为数值数组写出的列，其余列均按维度编码
+        date_column: 日期列名
+
+    Returns:
+        写出的记录数
+    """
+    def dump(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+    dates: list = []
+    dictionaries = {}
+    codes = {}
+    values = {}
+    for col in df.columns:
+        if col in value_columns:
+            value_codes, table = encode_json_column(df[col])
+            table[table == 'NaN'] = 'null'
+            values[col] = '[' + ','.join(table.take(value_codes).tolist()) + ']'
+            continue
+        col_codes, dictionary = _dictionary_encode(df[col], sort=(col == date_column))
+        if col == date_column:
+            dates = dictionary
+        else:
+            dictionaries[col] = [None if isinstance(value, float) and np.isnan(value) else value
+                                 for value in dictionary]
+        codes[col] = '[' + ','.join(map(str, col_codes.tolist())) + ']'
+
+    fp.write('{"format":' + dump(COLUMNAR_FORMAT))
+    fp.write(',"length":' + str(len(df)))
+    fp.write(',"columns":' + dump([str(col) for col in df.columns]))
+    fp.write(',"dates":' + dump(dates))
+    fp.write(',"dictionaries":' + dump(dictionaries))
+    fp.write(',"codes":{' + ','.join(dump(str(col)) + ':' + text for col, text in codes.items()) + '}')
+    fp.write(',"values":{' + ','.join(dump(str(col)) + ':' + text for col, text in values.items()) + '}')
+    fp.write('}')
+    return len(df)
+
+
+# 预压缩的兄弟文件: (编码, 扩展名)
+PRECOMPRESSED_ENCODINGS = (('gzip', '.gz'), ('br', '.br'))
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    """
+    以最高压缩级别压缩数据
+
+    gzip不写入时间戳，相同内容总是得到相同的压缩结果。
+
+    Args:
+        data: 原始字节
+        encoding: "gzip"或"br"
+
+    Returns:
+        压缩后的字节
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        if brotli is None:
+            raise RuntimeError("未安装brotli，无法生成.br文件")
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11, lgwin=24)
+    raise ValueError(f"不支持的压缩编码: {encoding}")
+
+
+def precompress_file(path: str, force: bool = False) -> Dict[str, Any]:
+    """
+    为文件生成.gz和.br兄弟文件（未安装brotli时只生成.gz），兄弟文件比源文件新时跳过
+
+    Args:
+        path: 源文件路径
+        force: 是否忽略已有的兄弟文件重新压缩
+
+    Returns:
+        {"path", "raw_bytes", "gzip_bytes", "br_bytes"}，未生成的编码没有对应的键
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    result: Dict[str, Any] = {"path": path, "raw_bytes": len(data)}
+    source_mtime = os.stat(path).st_mtime_ns
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        target = path + suffix
+        if not force and os.path.exists(target) and os.stat(target).st_mtime_ns >= source_mtime:
+            result[f"{encoding}_bytes"] = os.path.getsize(target)
+            continue
+        payload = compress_bytes(data, encoding)
+        # 先写临时文件再替换，避免服务器读到写了一半的文件
+        with open(target + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(target + '.tmp', target)
+        result[f"{encoding}_bytes"] = len(payload)
+    return result
+
+
+def precompress_files(paths: Iterable[str], workers: Optional[int] = None, force: bool = False) -> List[Dict[str, Any]]:
+    """
+    在进程池中并行为多个文件生成.gz和.br兄弟文件
+
+    Args:
+        paths: 源文件路径
+        workers: 工作进程数，为None时使用CPU核数，为1时在当前进程中依次压缩
+        force: 是否忽略已有的兄弟文件重新压缩
+
+    Returns:
+        与paths顺序相同的precompress_file结果列表
+    """
+    paths = list(paths)
+    if workers == 1 or len(paths) <= 1:
+        return [precompress_file(path, force) for path in paths]
+    # 大文件先提交，避免最后只剩一个进程在压缩最大的文件
+    order = sorted(range(len(paths)), key=lambda i: -os.path.getsize(paths[i]))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(order, pool.map(precompress_file, [paths[i] for i in order], [force] * len(paths))))
+    return [results[i] for i in range(len(paths))]
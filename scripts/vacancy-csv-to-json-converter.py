@@ -4,10 +4,15 @@ import re
 import numpy as np
 from datetime import datetime
 
+from statcan_common import broadcast_by_codes, extract_classification_code, factorize_values
+
+# 行业名称中的NAICS代码部分,如" [23]"
+INDUSTRY_CODE_PATTERN = r'\s*\[\d+.*?\]'
+
 def clean_industry_name(name):
     """清理行业名称,移除代码部分"""
     if isinstance(name, str) and '[' in name:
-        return re.sub(r'\s*\[\d+.*?\]', '', name).strip()
+        return re.sub(INDUSTRY_CODE_PATTERN, '', name).strip()
     return name
 
 # Added helper to safely convert values (handles NaN)
@@ -41,7 +46,8 @@ def convert_csv_to_json(csv_file, output_json_file):
     
     # 清理行业名称
     naics_col = 'North American Industry Classification System (NAICS)'
-    df[naics_col] = df[naics_col].apply(clean_industry_name)
+    codes, names = factorize_values(df[naics_col])
+    df[naics_col] = broadcast_by_codes(codes, [clean_industry_name(name) for name in names], df.index)
     
     # 创建一个综合JSON结构,包含多个部分
     result = {
@@ -174,21 +180,17 @@ def convert_csv_to_json(csv_file, output_json_file):
         # 可以添加按省份的分析,但当前数据可能只有Canada整体数据
     
     # 添加行业分类
-    result['industry_classifications'] = []
-    for industry in industries:
-        if industry != 'Total, all industries':
-            # 提取行业代码(如果有)
-            code = ''
-            if '[' in industry and ']' in industry:
-                code_match = re.search(r'\[(.*?)\]', industry)
-                if code_match:
-                    code = code_match.group(1)
-            
-            result['industry_classifications'].append({
-                'name': clean_industry_name(industry),
-                'code': code,
-                'full_name': industry
-            })
+    classified = pd.Series([industry for industry in industries if industry != 'Total, all industries'], dtype=object)
+    # 提取行业代码(如果有)，对所有行业一次匹配
+    classification_codes = extract_classification_code(classified)
+    result['industry_classifications'] = [
+        {
+            'name': clean_industry_name(industry),
+            'code': code,
+            'full_name': industry
+        }
+        for industry, code in zip(classified.tolist(), classification_codes.tolist())
+    ]
     
     # 将结果写入JSON文件
     with open(output_json_file, 'w', encoding='utf-8') as f:
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import * as dataUtils from './utils/dataProcessing';
 import {
   filterByTimeframe,
@@ -31,6 +31,7 @@ const Dashboard = (props) => {
   const [educationData, setEducationData] = useState([]);
   const [regionData, setRegionData] = useState([]);
   const [occupationData, setOccupationData] = useState([]);
+  const [industrySummary, setIndustrySummary] = useState(null);
   const [selectedTimeframe, setSelectedTimeframe] = useState('10 Years');
   const [activeTab, setActiveTab] = useState('Overview');
   const [selectedProvinces, setSelectedProvinces] = useState(['Alberta', 'Canada', 'British Columbia', 'Ontario']);
@@ -50,17 +51,36 @@ const Dashboard = (props) => {
     return timeframeMapping[label] || '10y';
   };
 
-  // 加载数据
+  // 已请求的JSON文件: {URL: Promise}，切换时间范围时只请求尚未加载的分片；请求失败的条目会被移除，下次重新请求
+  const fetchCache = useRef(new Map());
+
+  // 加载数据，时间范围变化时按需加载更早的分片
   useEffect(() => {
+    let cancelled = false;
+
+    const fetchJson = (url) => {
+      if (!fetchCache.current.has(url)) {
+        const request = fetch(url).then(response => {
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          return response.json();
+        }).catch(err => {
+          if (fetchCache.current.get(url) === request) fetchCache.current.delete(url);
+          throw err;
+        });
+        fetchCache.current.set(url, request);
+      }
+      return fetchCache.current.get(url);
+    };
+
     const fetchData = async () => {
       try {
-        setLoading(true);
-
         // 加载本地JSON文件
         const loadLocalFile = async (filename) => {
           try {
-            const response = await fetch(`./data/${filename}.json`);
-            const data = await response.json();
+            const data = await fetchJson(`./data/${filename}.json`);
+            if (dataUtils.isColumnarData(data)) {
+              return dataUtils.decodeColumnarData(data);
+            }
             return Array.isArray(data) ? data : [data];
           } catch (err) {
             console.error(`Error loading ${filename}.json:`, err);
@@ -68,27 +88,62 @@ const Dashboard = (props) => {
           }
         };
 
-        // 并行加载所有数据
-        const [alberta, province, industry, sex, age, city, education, region, occupation] = await Promise.all([
-          loadLocalFile('alberta'),
-          loadLocalFile('province'),
-          loadLocalFile('industry'),
-          loadLocalFile('sex'),
-          loadLocalFile('age'),
-          loadLocalFile('city'),
-          loadLocalFile('education'),
-          loadLocalFile('region'),
-          loadLocalFile('occupation')
+        // 分片清单，不存在时回退到加载完整文件
+        const shardManifest = await fetchJson('./data/shards/manifest.json').catch(() => null);
+
+        // 只加载覆盖时间范围所需的分片
+        const loadDataset = async (filename, timeframe) => {
+          const dataset = shardManifest && shardManifest.datasets && shardManifest.datasets[filename];
+          if (!dataset) return loadLocalFile(filename);
+          try {
+            const shards = dataUtils.selectTimeframeShards(dataset, timeframe);
+            const parts = await Promise.all(shards.map(shard => fetchJson(`./data/shards/${shard.file}`)));
+            return parts.flatMap(part => dataUtils.isColumnarData(part) ? dataUtils.decodeColumnarData(part) : part);
+          } catch (err) {
+            console.warn(`Shards for ${filename} unavailable, loading the full file instead:`, err);
+            return loadLocalFile(filename);
+          }
+        };
+
+        // 优先加载ETL预先透视的图表数据，不存在时回退到加载原始数据并在客户端处理
+        const loadChartSeries = async (filename, processData, timeframe) => {
+          try {
+            const rows = await fetchJson(`./data/chart/${filename}.json`);
+            if (Array.isArray(rows)) {
+              return dataUtils.hydrateChartSeries(rows);
+            }
+          } catch (err) {
+            console.warn(`Chart data for ${filename} unavailable, processing raw data instead:`, err);
+          }
+          return processData(await loadDataset(filename, timeframe));
+        };
+
+        const timeframe = getTimeframeValue(selectedTimeframe);
+
+        // 并行加载所有数据；城市和区域只使用最新日期的数据，最近一年的分片即可覆盖
+        const [
+          processedProvinceData, processedIndustryData, sex, age, city, processedEducationData, region, occupation,
+          industrySummaryFile
+        ] = await Promise.all([
+          loadChartSeries('province', dataUtils.processProvinceData, timeframe),
+          loadChartSeries('industry', dataUtils.processIndustryData, timeframe),
+          loadDataset('sex', timeframe),
+          loadDataset('age', timeframe),
+          loadDataset('city', '1y'),
+          loadChartSeries('education', dataUtils.processEducationData, timeframe),
+          loadDataset('region', '1y'),
+          loadDataset('occupation', timeframe),
+          // 行业摘要只用于构建行业选择器，不存在时回退到从行业数据中收集
+          fetchJson('./data/summary/industry.json').catch(() => null)
         ]);
+        if (cancelled) return;
 
         // 处理和格式化数据
-        const processedAlbertaData = dataUtils.processAlbertaData(alberta);
-        const processedProvinceData = dataUtils.processProvinceData(province);
-        const processedIndustryData = dataUtils.processIndustryData(industry);
+        // Alberta系列直接取自省份数据，不再单独加载alberta.json
+        const processedAlbertaData = dataUtils.extractChartSeries(processedProvinceData, 'Alberta');
         const processedSexData = dataUtils.processSexData(sex);
         const processedAgeData = dataUtils.processAgeData(age);
         const processedCityData = dataUtils.processCMAData(city);
-        const processedEducationData = dataUtils.processEducationData(education);
         const processedRegionData = dataUtils.processRegionData(region);
         const processedOccupationData = dataUtils.processOccupationData(occupation);
 
@@ -101,9 +156,11 @@ const Dashboard = (props) => {
         setEducationData(processedEducationData);
         setRegionData(processedRegionData);
         setOccupationData(processedOccupationData);
+        setIndustrySummary(industrySummaryFile);
 
         setLoading(false);
       } catch (err) {
+        if (cancelled) return;
         console.error("Data loading error:", err);
         setError("Failed to load data: " + err.message);
         setLoading(false);
@@ -111,7 +168,10 @@ const Dashboard = (props) => {
     };
 
     fetchData();
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedTimeframe]);
 
   // 基于时间范围过滤数据
   const filteredAlbertaData = useMemo(() => {
@@ -142,6 +202,12 @@ const Dashboard = (props) => {
     return dataUtils.filterByTimeframe(occupationData, getTimeframeValue(selectedTimeframe));
   }, [occupationData, selectedTimeframe]);
 
+  // 行业选择器的选项取自ETL生成的行业摘要，摘要不可用时从行业数据中收集
+  const availableIndustries = useMemo(() => {
+    const summaryIndustries = dataUtils.getSummaryValues(industrySummary, 'NAICS Description').filter(Boolean);
+    return summaryIndustries.length > 0 ? summaryIndustries : dataUtils.getAvailableIndustries(filteredIndustryData);
+  }, [industrySummary, filteredIndustryData]);
+
   // For debugging, let's log the data to see if it's available
   useEffect(() => {
     if (!loading) {
@@ -245,7 +311,7 @@ const Dashboard = (props) => {
         <div className="mb-4">
           <p className="text-sm text-gray-600 mb-2">选择行业查看失业率趋势:</p>
           <div className="flex flex-wrap gap-2">
-            {dataUtils.getAvailableIndustries(filteredIndustryData).map(industry => (
+            {availableIndustries.map(industry => (
               <div
                 key={industry}
                 className={`px-3 py-1 rounded-full text-sm cursor-pointer ${selectedIndustries.includes(industry)
@@ -5,36 +5,137 @@ export const formatDate = (date) => {
     return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
 };
 
+/**
+ * 判断是否为ETL输出的列式（字典编码）数据
+ *
+ * @param {*} payload - 从JSON文件解析出的数据
+ * @returns {boolean} 是否为列式数据
+ */
+export const isColumnarData = (payload) => {
+    return Boolean(payload) && !Array.isArray(payload) && payload.format === 'columnar-v1';
+};
+
+/**
+ * 将列式、字典编码的数据还原为记录数组
+ *
+ * @param {Object} payload - ETL以columnar布局输出的数据
+ * @returns {Array} 与记录数组布局相同的数据
+ */
+export const decodeColumnarData = (payload) => {
+    if (!isColumnarData(payload)) return Array.isArray(payload) ? payload : [];
+
+    const { length, columns, dates, dictionaries, codes, values } = payload;
+
+    // 预先确定每一列的取值方式，逐行循环中只做数组下标访问
+    const readers = columns.map(column => {
+        if (values[column]) {
+            const columnValues = values[column];
+            return index => columnValues[index];
+        }
+        const dictionary = dictionaries[column] || dates;
+        const columnCodes = codes[column];
+        return index => {
+            const code = columnCodes[index];
+            return code < 0 ? null : dictionary[code];
+        };
+    });
+
+    const records = new Array(length);
+    for (let i = 0; i < length; i++) {
+        const record = {};
+        for (let j = 0; j < columns.length; j++) {
+            record[columns[j]] = readers[j](i);
+        }
+        records[i] = record;
+    }
+    return records;
+};
+
+/**
+ * 将ETL预先透视的图表数据（data/chart/*.json）还原为处理函数返回的形状
+ *
+ * ETL已按processProvinceData、processIndustryData、processEducationData的规则完成筛选、按月分组和排序，
+ * 这里只需把ISO日期字符串转换为Date，并按本地时间重新生成formattedDate。
+ *
+ * @param {Array} rows - 图表数据行
+ * @returns {Array} 与对应处理函数返回值形状相同的数据
+ */
+export const hydrateChartSeries = (rows) => {
+    if (!Array.isArray(rows)) return [];
+
+    return rows.map(row => {
+        const date = new Date(row.date);
+        return { ...row, date, formattedDate: formatDate(date) };
+    });
+};
+
+/**
+ * 计算时间范围对应的起始日期
+ *
+ * @param {string} timeframe - 时间范围（1y、3y、5y、10y、all）
+ * @param {Date} now - 当前时间
+ * @returns {Date|null} 起始日期，all或未知时间范围返回null
+ */
+export const getTimeframeCutoff = (timeframe, now = new Date()) => {
+    const years = { '1y': 1, '3y': 3, '5y': 5, '10y': 10 }[timeframe];
+    if (!years) return null;
+
+    const cutoffDate = new Date(now);
+    cutoffDate.setFullYear(cutoffDate.getFullYear() - years);
+    return cutoffDate;
+};
+
 /**
  * 根据选择的时间范围筛选数据
  */
 export const filterByTimeframe = (data, timeframe) => {
     if (!data || data.length === 0) return [];
 
-    const now = new Date();
-    let cutoffDate;
-
-    switch (timeframe) {
-        case '1y':
-            cutoffDate = new Date(now.setFullYear(now.getFullYear() - 1));
-            break;
-        case '3y':
-            cutoffDate = new Date(now.setFullYear(now.getFullYear() - 3));
-            break;
-        case '5y':
-            cutoffDate = new Date(now.setFullYear(now.getFullYear() - 5));
-            break;
-        case '10y':
-            cutoffDate = new Date(now.setFullYear(now.getFullYear() - 10));
-            break;
-        case 'all':
-        default:
-            return data;
-    }
+    const cutoffDate = getTimeframeCutoff(timeframe);
+    if (!cutoffDate) return data;
 
     return data.filter(item => item.date >= cutoffDate);
 };
 
+/**
+ * 从分片清单中选出覆盖时间范围所需的分片
+ *
+ * ETL按最新月份往前把每个数据集划分为1y、3y、5y、10y和all分片（见data/shards/manifest.json），
+ * 只需加载结束日期不早于时间范围起始日期的分片；返回的分片按从旧到新排列，依次拼接即可。
+ *
+ * @param {Object} dataset - 分片清单中的数据集
+ * @param {string} timeframe - 时间范围
+ * @param {Date} now - 当前时间
+ * @returns {Array} 需要加载的分片
+ */
+export const selectTimeframeShards = (dataset, timeframe, now = new Date()) => {
+    if (!dataset || !Array.isArray(dataset.shards)) return [];
+
+    const cutoffDate = getTimeframeCutoff(timeframe, now);
+    return dataset.shards
+        .filter(shard => !cutoffDate || (shard.end && new Date(shard.end) >= cutoffDate))
+        .reverse();
+};
+
+/**
+ * 从按月透视的宽表中取出单个系列，例如从省份数据中取出Alberta
+ *
+ * 宽表为processProvinceData或hydrateChartSeries的返回值，每行为 {date, formattedDate, <系列名>: 值}。
+ * 结果与对原始记录调用processAlbertaData的形状相同，不需要为该系列再加载一个数据文件；
+ * 该系列在某个月没有记录时跳过该月，值为null时保留。
+ *
+ * @param {Array} rows - 宽表行
+ * @param {string} series - 系列名
+ * @returns {Array} 按日期排序的 {date, formattedDate, value}
+ */
+export const extractChartSeries = (rows, series) => {
+    if (!Array.isArray(rows)) return [];
+
+    return rows
+        .filter(row => Object.prototype.hasOwnProperty.call(row, series))
+        .map(row => ({ date: row.date, formattedDate: row.formattedDate, value: row[series] }));
+};
+
 /**
  * 处理Alberta失业率数据
  *
@@ -505,3 +606,16 @@ export const getAvailableOccupations = (data) => {
 
     return Array.from(occupations).sort();
 };
+
+/**
+ * 从输出摘要中取出某个维度的可用值，用于构建选择器而不必加载完整数据
+ *
+ * @param {Object} summary - ETL生成的输出摘要（summary/<输出文件名>）
+ * @param {string} column - 维度列名，例如 'GeoName'
+ * @returns {Array} 排序后的不同值；摘要中没有该列时为空数组
+ */
+export const getSummaryValues = (summary, column) => {
+    if (!summary || !summary.dimensions || !Array.isArray(summary.dimensions[column])) return [];
+
+    return summary.dimensions[column];
+};